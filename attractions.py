@@ -0,0 +1,199 @@
+# attractions.py — attraction concept taxonomy + per-concept row bitmaps for the attractions filter
+"""
+The `specification` text of a listing contains attraction phrases ("Near Beach,
+Near Old Town"). Built once per dataset (or partition / shared version, so a
+refreshed dataset gets a fresh taxonomy):
+
+- the taxonomy: every distinct "Near ..." phrase found in the data, tagged
+  with the concepts of its words. A word that starts with a synonym keyword
+  (CONCEPT_KEYWORDS: "beachfront" -> beach -> Beach & Coast) gets that
+  synonym group (plus the rest of a compound word when other phrases use it:
+  "Riverwalk" -> Riverside, Walk); any other word is its own concept ("Near
+  Night Bazaar" -> Night, Bazaar). The groups are kept to near-synonyms on
+  purpose, so a query never widens to merely "similar" places (a stadium to
+  a convention hall, a sunset view to a sunset bar);
+- one row bitmap (uint64 words, bit i = row position i) per phrase.
+
+A query phrase expands to its related phrases, those carrying all of its
+concepts ("Near Beach" -> Beachfront, Oceanfront, Coastal Boardwalk, ...;
+"Near Stadium" -> only itself). The filter is the OR of their bitmaps per
+selected phrase, AND across phrases — a handful of word-wise operations
+instead of string scans over the column.
+
+    python attractions.py --csv dataset/Airbnb_Cleaned.csv --out taxonomy.json --query "Near Beach"
+"""
+import argparse
+import json
+import re
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+PHRASE_PATTERN = r"(?i)\bnear\s+[^,;|·\n]+"
+
+# Kelompok sinonim dekat (dicocokkan sebagai awalan kata: "river" -> Riverbank, Riverwalk, Riverside).
+# Sengaja sempit: hanya tempat yang bisa saling menggantikan, bukan kategori luas.
+CONCEPT_KEYWORDS = {
+    "Beach & Coast": ["beach", "ocean", "coast", "seafront"],
+    "Harbor & Marina": ["harbor", "harbour", "marina"],
+    "Riverside": ["river"],
+    "Lakeside": ["lake"],
+    "Viewpoint": ["view", "lookout"],  # view, viewpoint, lookout
+}
+# Kata pengisi yang tidak membedakan tempat. Kata seperti view / walk / street / point tetap dihitung,
+# supaya "Near Sunset View" tidak melebar ke "Near Sunset Bar".
+STOPWORDS = {"near", "the", "and", "of", "at", "on", "area", "spot"}
+
+
+def _key(phrase):
+    return " ".join(phrase.lower().split())
+
+
+def _words(phrase):
+    return [w for w in re.findall(r"\w+", phrase.lower()) if w not in STOPWORDS]
+
+
+def build_taxonomy(phrase_counts, concepts=CONCEPT_KEYWORDS):
+    """
+    Tag phrases ({phrase: listings}) with their concepts. Returns a JSON-able dict:
+    {"concepts": {concept: [phrases]}, "phrases": {phrase: {"listings", "concepts"}}}.
+    """
+    vocabulary = {word for phrase in phrase_counts for word in _words(phrase)}
+    phrase_concepts = {}
+    for phrase in phrase_counts:
+        names = []
+        for word in _words(phrase):
+            name, rest = word.title(), None
+            for concept, keys in concepts.items():
+                key = next((k for k in keys if word.startswith(k)), None)
+                if key is not None:
+                    name, rest = concept, word[len(key):]
+                    break
+            # Kata majemuk: sisa kata yang juga dipakai frasa lain tetap dihitung ("Riverwalk" = river + walk)
+            for part in (name, rest.title() if rest in vocabulary else None):
+                if part and part not in names:
+                    names.append(part)
+        # frasa tanpa kata bermakna ("Near Area") berdiri sendiri
+        phrase_concepts[phrase] = names or [re.sub(r"(?i)^near\s+", "", phrase)]
+
+    grouped = defaultdict(list)
+    for phrase, names in phrase_concepts.items():
+        for name in names:
+            grouped[name].append(phrase)
+    return {
+        "concepts": {name: sorted(phrases) for name, phrases in sorted(grouped.items())},
+        "phrases": {
+            phrase: {"listings": int(phrase_counts[phrase]), "concepts": phrase_concepts[phrase]}
+            for phrase in sorted(phrase_counts)
+        },
+    }
+
+
+class AttractionIndex:
+    def __init__(self, specifications, concepts=CONCEPT_KEYWORDS):
+        """`specifications`: the specification text per row position (Series, list or Arrow column)."""
+        # Frasa dicari per teks specification yang berbeda (banyak listing berbagi teks yang sama)
+        spec_codes, specs = pd.factorize(pd.Series(np.asarray(specifications, dtype=object)))
+        self.n_rows = len(spec_codes)
+        spec_rows = np.bincount(spec_codes[spec_codes >= 0], minlength=len(specs))
+
+        found = pd.Series(specs, dtype=object).astype(str).str.findall(PHRASE_PATTERN).explode().dropna().str.strip()
+        found = found[found.str.len() > 0]
+        pairs = pd.DataFrame(
+            {"key": found.map(_key).to_numpy(), "text": found.to_numpy(), "spec": found.index.to_numpy(dtype=np.int64)}
+        ).drop_duplicates(["key", "spec"])
+        pairs["rows"] = spec_rows[pairs["spec"].to_numpy()]
+
+        # Ejaan yang paling sering dipakai untuk tiap frasa (key = huruf kecil, spasi dirapikan)
+        by_text = pairs.groupby(["key", "text"])["rows"].sum()
+        spelling = by_text.groupby(level="key").idxmax().map(lambda key_text: key_text[1])
+        listings = pairs.groupby("key")["rows"].sum()
+        self.taxonomy = build_taxonomy({spelling[k]: listings[k] for k in spelling.index}, concepts)
+
+        self.phrases = list(self.taxonomy["phrases"])  # urut alfabet = opsi dropdown
+        self._slot = {_key(p): i for i, p in enumerate(self.phrases)}
+
+        n_words = (self.n_rows + 63) // 64
+        self.bits = np.zeros((len(self.phrases), n_words), dtype=np.uint64)
+        packed = self.bits.view(np.uint8).reshape(len(self.phrases), n_words * 8)
+        for key, specs_with in pairs.groupby("key")["spec"]:
+            has = np.zeros(len(specs) + 1, dtype=bool)  # slot terakhir = specification kosong (kode -1)
+            has[specs_with.to_numpy()] = True
+            # byte b, bit i (little) = baris 8b + i; OR/AND per word tidak bergantung urutan byte
+            row_bits = np.packbits(has[spec_codes], bitorder="little")
+            packed[self._slot[key], : len(row_bits)] = row_bits
+        self.bits.setflags(write=False)
+        self._expanded = {}  # frasa -> bitmap gabungan frasa terkait (diisi saat pertama kali ditanya)
+
+    def _canonical(self, phrase):
+        slot = self._slot.get(_key(phrase))
+        return None if slot is None else self.phrases[slot]
+
+    def concepts_of(self, phrase):
+        phrase = self._canonical(phrase)
+        return self.taxonomy["phrases"][phrase]["concepts"] if phrase else []
+
+    def related(self, phrase):
+        """Phrases a query for `phrase` expands to: those in (at least) all of its concepts, itself first."""
+        phrase = self._canonical(phrase)
+        if phrase is None:
+            return []
+        wanted = set(self.concepts_of(phrase))
+        others = [p for p, info in self.taxonomy["phrases"].items() if p != phrase and wanted <= set(info["concepts"])]
+        return [phrase, *others]
+
+    def _phrase_bitmap(self, phrase):
+        key = _key(phrase)
+        if key not in self._expanded:
+            slots = [self._slot[_key(p)] for p in self.related(phrase)]
+            bitmap = np.bitwise_or.reduce(self.bits[slots], axis=0) if slots else np.zeros(self.bits.shape[1], np.uint64)
+            bitmap.setflags(write=False)
+            self._expanded[key] = bitmap
+        return self._expanded[key]
+
+    def bitmap(self, selected):
+        """Row bitmap of listings matching every selected phrase (each expanded to its related phrases)."""
+        result = None
+        for phrase in selected:
+            bitmap = self._phrase_bitmap(phrase)
+            result = bitmap if result is None else result & bitmap
+        return np.full(self.bits.shape[1], np.iinfo(np.uint64).max, dtype=np.uint64) if result is None else result
+
+    def mask(self, selected):
+        """Boolean mask over row positions for `selected` (all True when nothing is selected)."""
+        if not selected:
+            return np.ones(self.n_rows, dtype=bool)
+        packed = self.bitmap(selected).view(np.uint8)  # urutan byte sama seperti saat dibangun
+        return np.unpackbits(packed, bitorder="little", count=self.n_rows).view(bool)
+
+
+if __name__ == "__main__":
+    from dataset_store import read_listings_csv
+
+    parser = argparse.ArgumentParser(description="Build the attraction taxonomy of a listings CSV.")
+    parser.add_argument("--csv", default="dataset/Airbnb_Cleaned.csv")
+    parser.add_argument("--out", default=None, help="write the taxonomy (JSON) here for review")
+    parser.add_argument("--query", action="append", default=[], help="phrase to expand and time (repeatable)")
+    args = parser.parse_args()
+
+    frame = read_listings_csv(args.csv)
+    t0 = time.perf_counter()
+    index = AttractionIndex(frame["specification"])
+    print(f"{len(index.phrases)} phrases, {len(index.taxonomy['concepts'])} concepts, "
+          f"{index.n_rows} rows in {time.perf_counter() - t0:.2f}s ({index.bits.nbytes / 2**20:.1f} MB of bitmaps)")
+    for name, phrases in index.taxonomy["concepts"].items():
+        print(f"  {name}: {', '.join(phrases)}")
+    if args.query:
+        print("query:", args.query, "->", [index.related(q) for q in args.query])
+        for label in ("cold", "warm"):  # cold = bitmap frasa terkait belum digabung
+            t0 = time.perf_counter()
+            bitmap = index.bitmap(args.query)
+            t1 = time.perf_counter()
+            mask = index.mask(args.query)
+            t2 = time.perf_counter()
+            print(f"  {label}: bitmap {(t1 - t0) * 1e6:.0f} us, mask {(t2 - t1) * 1e6:.0f} us, {int(mask.sum())} listings")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(index.taxonomy, f, indent=2)
@@ -0,0 +1,200 @@
+# batch_recommend.py — offline top-N stays for every user profile (email campaigns / pre-warming)
+"""
+Reads a profile file, splits it into chunks and ranks each chunk in a process
+pool. Workers memory-map the same Arrow copy of the dataset (dataset_store.py),
+so the dataset is never copied per worker; each worker writes its own Parquet
+part file, so the parent never has to collect the results.
+
+Profiles (CSV or JSON lines):
+    user_id, country[, property_type][, activities]   # activities: "Near Beach|Near Temple"
+
+Output directory of Parquet parts with columns:
+    user_id, section ("top_stays" | "popular" | "activities"), rank, listing_id
+
+    python batch_recommend.py --profiles profiles.csv --out recs/ --workers 8
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset_store import FilterMasks, build_arrow_dataset, listing_ids, numeric_column, open_arrow_dataset
+from ranking import rank_order, top_positions
+
+OUTPUT_SCHEMA = pa.schema(
+    [
+        ("user_id", pa.string()),
+        ("section", pa.dictionary(pa.int8(), pa.string())),
+        ("rank", pa.int16()),
+        ("listing_id", pa.int64()),
+    ]
+)
+MAX_TOP_N = np.iinfo(np.int16).max  # rank disimpan sebagai int16
+
+# -------------------- Worker state (one per process) --------------------
+_table = None
+_rating = None
+_reviews = None
+_listing_ids = None
+_order = None
+_masks = None
+_result_cache = {}
+
+
+def _init_worker(store_path):
+    global _table, _rating, _reviews, _listing_ids, _order, _masks
+    _table = open_arrow_dataset(store_path)
+    _rating = numeric_column(_table, "review_scores_rating")
+    _reviews = numeric_column(_table, "number_of_reviews")
+    # satu kali sort global per worker; tiap profil cukup memfilter urutan ini
+    _order = rank_order(_rating, _reviews)
+    _listing_ids = listing_ids(_table)
+    # filter sama seperti app (country, property type, atraksi terkait), di-cache per nilai
+    _masks = FilterMasks(_table)
+    _result_cache.clear()
+
+
+def _and(mask, other):
+    return other if mask is None else mask & other
+
+
+def recommend(country, property_type, activities, n):
+    """
+    Ranked listing ids per section for one profile spec, memoised per worker
+    (profiles that share a spec are ranked once).
+    """
+    key = (country, property_type, activities, n)
+    if key in _result_cache:
+        return _result_cache[key]
+
+    base = _masks.country(country)
+    sections = {"popular": top_positions(_rating, _reviews, base, n, order=_order)}
+    if property_type and "property_type" in _table.column_names:
+        sections["top_stays"] = top_positions(
+            _rating, _reviews, _and(base, _masks.property_type(property_type)), n, order=_order
+        )
+    if activities and "specification" in _table.column_names:
+        mask = base
+        for activity in activities:
+            mask = _and(mask, _masks.activity(activity))
+        sections["activities"] = top_positions(_rating, _reviews, mask, n, order=_order)
+
+    result = {name: _listing_ids[pos] for name, pos in sections.items()}
+    _result_cache[key] = result
+    return result
+
+
+def _run_chunk(task):
+    """Rank one chunk of profiles and write it as a Parquet part. Returns (rows_written, seconds)."""
+    part_no, profiles, out_dir, n = task
+    t0 = time.perf_counter()
+    users, sections, ranks, ids = [], [], [], []
+    for user_id, country, property_type, activities in profiles:
+        for section, listing_ids in recommend(country, property_type, activities, n).items():
+            k = len(listing_ids)
+            users.extend([user_id] * k)
+            sections.extend([section] * k)
+            ranks.append(np.arange(1, k + 1, dtype=np.int16))
+            ids.append(listing_ids)
+
+    table = pa.table(
+        {
+            "user_id": pa.array(users, pa.string()),
+            "section": pa.array(sections, pa.string()).dictionary_encode().cast(OUTPUT_SCHEMA.field("section").type),
+            "rank": pa.array(np.concatenate(ranks) if ranks else np.empty(0, np.int16)),
+            "listing_id": pa.array(np.concatenate(ids).astype(np.int64) if ids else np.empty(0, np.int64)),
+        },
+        schema=OUTPUT_SCHEMA,
+    )
+    pq.write_table(table, os.path.join(out_dir, f"part-{part_no:05d}.parquet"), compression="zstd")
+    return table.num_rows, time.perf_counter() - t0
+
+
+# -------------------- Driver --------------------
+def read_profiles(path):
+    """Load profiles as a list of (user_id, country, property_type | None, activities tuple)."""
+    if path.endswith((".jsonl", ".json")):
+        frame = pd.read_json(path, lines=True, dtype={"user_id": str})
+    else:
+        frame = pd.read_csv(path, dtype={"user_id": str})
+    if "user_id" not in frame.columns or "country" not in frame.columns:
+        raise ValueError("profile file needs at least 'user_id' and 'country' columns")
+
+    def clean(value):
+        return None if pd.isna(value) or str(value).strip() == "" else str(value).strip()
+
+    property_types = frame["property_type"] if "property_type" in frame.columns else [None] * len(frame)
+    activities = frame["activities"] if "activities" in frame.columns else [None] * len(frame)
+    profiles = []
+    for user_id, country, ptype, acts in zip(frame["user_id"], frame["country"], property_types, activities):
+        acts = clean(acts)
+        profiles.append(
+            (
+                str(user_id),
+                clean(country),
+                clean(ptype),
+                tuple(sorted(a.strip() for a in acts.split("|") if a.strip())) if acts else (),
+            )
+        )
+    return profiles
+
+
+def run_batch(profiles_path, out_dir, dataset_path="dataset/Airbnb_Cleaned.csv", top_n=5,
+              workers=None, chunk_size=20000):
+    """Run the batch job and return a summary dict."""
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise ValueError(f"top_n must be between 1 and {MAX_TOP_N}, got {top_n}")
+    t0 = time.perf_counter()
+    store_path = dataset_path if dataset_path.endswith(".arrow") else build_arrow_dataset(dataset_path)
+    profiles = read_profiles(profiles_path)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(out_dir, "part-*.parquet")):
+        os.remove(old)
+
+    workers = workers or os.cpu_count() or 1
+    tasks = [
+        (part_no, profiles[start:start + chunk_size], out_dir, top_n)
+        for part_no, start in enumerate(range(0, len(profiles), chunk_size))
+    ]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store_path,)) as pool:
+        results = list(pool.map(_run_chunk, tasks))
+
+    wall = time.perf_counter() - t0
+    return {
+        "profiles": len(profiles),
+        "parts": len(tasks),
+        "rows": int(sum(rows for rows, _ in results)),
+        "workers": workers,
+        "wall_s": round(wall, 3),
+        "profiles_per_s": round(len(profiles) / wall, 1) if wall > 0 else None,
+        "out_dir": out_dir,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline personalized top-N stays for every profile.")
+    parser.add_argument("--profiles", required=True, help="CSV or JSON-lines profile file")
+    parser.add_argument("--out", required=True, help="output directory for Parquet parts")
+    parser.add_argument("--dataset", default="dataset/Airbnb_Cleaned.csv", help="listings CSV or prebuilt .arrow")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="profiles per task / Parquet part")
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.top_n <= MAX_TOP_N:
+        parser.error(f"--top-n must be between 1 and {MAX_TOP_N}")
+    summary = run_batch(args.profiles, args.out, args.dataset, args.top_n, args.workers, args.chunk_size)
+    print(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# dataset_store.py — typed, memory-mappable copy of the listings dataset (Arrow IPC)
+"""
+The CSV is parsed once and written as an uncompressed Arrow IPC file. Readers
+memory-map that file, so every process that opens it shares the same OS page
+cache instead of holding its own parsed copy of the data.
+
+    python dataset_store.py --csv dataset/Airbnb_Cleaned.csv --out dataset/Airbnb_Cleaned.arrow
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from attractions import AttractionIndex
+from normalize import DATE_COLUMNS, normalize_listings
+from ranking import country_pattern
+
+# Kolom angka disimpan sebagai float64 dengan NaN (bukan null) supaya bisa dibaca zero-copy
+NUMERIC_COLUMNS = [
+    "review_scores_rating", "number_of_reviews", "log_price", "was_price", "discount_pct",
+    "bedrooms", "bathrooms", "beds", "latitude", "longitude",
+]
+
+
+def read_listings_csv(path, with_report=False):
+    """
+    Load CSV safely. If parse_dates columns don't exist, load without parse_dates.
+    Columns are normalized here, once, for every consumer of the data
+    (normalize.normalize_listings); with `with_report` returns (df, report).
+    """
+    try:
+        df = pd.read_csv(path, parse_dates=DATE_COLUMNS, low_memory=False)
+    except ValueError:
+        df = pd.read_csv(path, low_memory=False)
+    df, report = normalize_listings(df)
+    return (df, report) if with_report else df
+
+
+def to_arrow_table(df):
+    """Convert the listings DataFrame to a single-chunk Arrow table with NaN-filled numeric columns."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for name in NUMERIC_COLUMNS:
+        if name in table.column_names:
+            col = pc.fill_null(table.column(name).cast(pa.float64()), float("nan"))
+            table = table.set_column(table.column_names.index(name), name, col)
+    return table.combine_chunks()
+
+
+def write_arrow_dataset(df, path):
+    """Write `df` as an Arrow IPC file at `path` (atomically, via a temp file)."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    table = to_arrow_table(df)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def build_arrow_dataset(csv_path, arrow_path=None):
+    """
+    Make sure an Arrow copy of `csv_path` exists and is newer than the CSV.
+    Returns the Arrow path (defaults to the CSV path with an .arrow suffix).
+    """
+    arrow_path = arrow_path or os.path.splitext(csv_path)[0] + ".arrow"
+    if not os.path.exists(arrow_path) or os.path.getmtime(arrow_path) < os.path.getmtime(csv_path):
+        write_arrow_dataset(read_listings_csv(csv_path), arrow_path)
+    return arrow_path
+
+
+def open_arrow_dataset(path):
+    """Memory-map an Arrow IPC file. Column buffers point into the mapping (zero copy)."""
+    source = pa.memory_map(path, "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def numeric_column(table, name):
+    """
+    Read-only float64 numpy array for column `name` (all NaN if missing).
+    Zero-copy for tables written by write_arrow_dataset.
+    """
+    if name not in table.column_names:
+        return np.full(table.num_rows, np.nan)
+    col = table.column(name)
+    if col.num_chunks == 1 and col.null_count == 0 and col.type == pa.float64():
+        return col.chunk(0).to_numpy(zero_copy_only=True)
+    arr = pc.fill_null(col.cast(pa.float64()), float("nan")).to_numpy()
+    arr.setflags(write=False)
+    return arr
+
+
+def bool_mask(values):
+    """Arrow boolean result -> numpy bool array, nulls counted as False."""
+    return pc.fill_null(values, False).to_numpy(zero_copy_only=False)
+
+
+def listing_ids(table):
+    """Listing id per row position as int64 (the row position itself when there is no `id` column)."""
+    if "id" not in table.column_names:
+        return np.arange(table.num_rows, dtype=np.int64)
+    column = table.column("id")
+    if column.null_count:
+        # normalize_listings menolak id kosong; null di sini = file Arrow dari versi lama
+        raise ValueError(f"{column.null_count} listings have no id; rebuild the Arrow copy from the CSV")
+    return column.to_numpy().astype(np.int64)
+
+
+class FilterMasks:
+    """
+    Row masks over one Arrow table with the same filter rules as the app, cached
+    per value. The offline tools (batch_recommend.py, replay_eval.py) keep one per
+    worker process. None means "every listing".
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._cache = {}
+        self._attractions = None
+
+    def cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def country(self, country):
+        """Listings of `country`, or None (everything) if none match — same rule as the app."""
+        def build():
+            if not country or "country" not in self.table.column_names:
+                return None
+            pattern = country_pattern(country)
+            mask = bool_mask(pc.match_substring_regex(self.table.column("country"), pattern, ignore_case=True))
+            return mask if mask.any() else None
+        return self.cached(("country", country), build)
+
+    def property_type(self, property_type):
+        if not property_type or "property_type" not in self.table.column_names:
+            return None
+        return self.cached(
+            ("property_type", property_type),
+            lambda: bool_mask(pc.equal(self.table.column("property_type"), property_type)),
+        )
+
+    def activity(self, activity):
+        """Listings near `activity` or a related attraction (attractions.py), like the app filter."""
+        if "specification" not in self.table.column_names:
+            return None
+        if self._attractions is None:
+            self._attractions = AttractionIndex(self.table.column("specification"))
+        return self.cached(("activity", activity), lambda: self._attractions.mask([activity]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the listings CSV to a memory-mappable Arrow file.")
+    parser.add_argument("--csv", default="dataset/Airbnb_Cleaned.csv")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+    print(build_arrow_dataset(args.csv, args.out))
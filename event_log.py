@@ -0,0 +1,282 @@
+# event_log.py — interaction event log: in-process ring buffer + batched background writer
+"""
+The app calls EventLog.log(...) during a rerun. That only appends a tuple to a
+bounded in-memory buffer (O(1), never waits on I/O). A background thread drains
+the buffer in batches and appends them as row groups to a Parquet file:
+
+    <root>/events-<start>-<pid>-<seq>.parquet.inprogress    file being written
+    <root>/events-<start>-<pid>-<seq>.parquet               closed file (readable)
+
+The current file is rolled (closed + renamed) after `max_file_rows` rows or
+`max_file_seconds`. When the writer falls behind and the buffer is full, new
+events are dropped and counted instead of growing memory or blocking the app.
+
+Columns: ts (timestamp ms, UTC), session_id, event, target, value, listing_id.
+
+    python event_log.py --bench --events 200000 --rate 20000    # drops / cost per call on this box
+"""
+import argparse
+import atexit
+import glob
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EVENT_SCHEMA = pa.schema(
+    [
+        ("ts", pa.timestamp("ms", tz="UTC")),
+        ("session_id", pa.string()),
+        ("event", pa.dictionary(pa.int16(), pa.string())),
+        ("target", pa.string()),
+        ("value", pa.string()),
+        ("listing_id", pa.int64()),
+    ]
+)
+INPROGRESS_SUFFIX = ".inprogress"
+_file_seq = itertools.count()  # unik per proses, juga kalau ada lebih dari satu EventLog
+
+
+def _as_text(value):
+    return None if value is None else str(value)
+
+
+def _as_listing_id(value):
+    """int64-compatible listing id, or None for missing / non-numeric ids (NaN, "", "abc")."""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(number) or number != int(number) or abs(number) >= 2**63:
+        return None
+    return int(value) if isinstance(value, (int, np.integer)) else int(number)
+
+
+class EventLog:
+    """
+    Thread-safe, non-blocking event sink for one process. Use one instance per
+    process (main.py keeps it in st.cache_resource) and call close() on shutdown.
+    """
+
+    def __init__(self, root, capacity=65536, batch_size=4096, flush_interval=1.0,
+                 max_file_rows=1_000_000, max_file_seconds=3600):
+        self.root = root
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_rows = max_file_rows
+        self.max_file_seconds = max_file_seconds
+        os.makedirs(root, exist_ok=True)
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self._writer = None
+        self._path = None
+        self._file_rows = 0
+        self._file_started = 0.0
+
+        self.logged = 0
+        self.dropped = 0
+        self.written = 0
+        self.files = 0
+        self.write_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # -------------------- Producer side (dipanggil saat rerun) --------------------
+    def log(self, event, session_id=None, target=None, value=None, listing_id=None):
+        """Queue one event. Never blocks on I/O; returns False if it was dropped (buffer full)."""
+        # dikonversi di sini supaya satu record aneh tidak menggagalkan seluruh batch di writer
+        record = (time.time_ns() // 1_000_000, _as_text(session_id), str(event), _as_text(target),
+                  _as_text(value), _as_listing_id(listing_id))
+        with self._lock:
+            if len(self._buffer) >= self.capacity or self._stop.is_set():
+                self.dropped += 1
+                return False
+            self._buffer.append(record)
+            self.logged += 1
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def log_many(self, event, session_id, listing_ids, target=None):
+        """
+        One event per listing id (e.g. card impressions of a grid page), queued under a
+        single lock acquisition. Events beyond the free capacity are dropped; returns the
+        number queued.
+        """
+        ts = time.time_ns() // 1_000_000
+        session_id, event, target = _as_text(session_id), str(event), _as_text(target)
+        records = [(ts, session_id, event, target, None, _as_listing_id(listing_id)) for listing_id in listing_ids]
+        with self._lock:
+            free = 0 if self._stop.is_set() else max(self.capacity - len(self._buffer), 0)
+            queued = min(free, len(records))
+            self._buffer.extend(records[:queued])
+            self.logged += queued
+            self.dropped += len(records) - queued
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wake.set()
+        return queued
+
+    # -------------------- Writer thread --------------------
+    def _take_batch(self):
+        with self._lock:
+            n = min(len(self._buffer), self.batch_size)
+            return [self._buffer.popleft() for _ in range(n)]
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+            if self._writer is not None and time.time() - self._file_started >= self.max_file_seconds:
+                self._roll()
+        self._drain()
+        self._roll()
+
+    def _drain(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except (OSError, pa.ArrowException):
+                # batch hilang tapi dihitung; thread writer tetap hidup (dropped juga diubah log() -> pakai lock)
+                with self._lock:
+                    self.write_errors += 1
+                    self.dropped += len(batch)
+
+    def _write(self, batch):
+        columns = list(zip(*batch))
+        table = pa.Table.from_arrays(
+            [
+                pa.array(columns[0], type=pa.int64()).cast(EVENT_SCHEMA.field("ts").type),
+                pa.array(columns[1], type=pa.string()),
+                pa.array(columns[2], type=pa.string()).dictionary_encode().cast(EVENT_SCHEMA.field("event").type),
+                pa.array(columns[3], type=pa.string()),
+                pa.array(columns[4], type=pa.string()),
+                pa.array(columns[5], type=pa.int64()),
+            ],
+            schema=EVENT_SCHEMA,
+        )
+        if self._writer is None:
+            self._open()
+        self._writer.write_table(table)
+        self._file_rows += len(batch)
+        self.written += len(batch)
+        if self._file_rows >= self.max_file_rows:
+            self._roll()
+
+    def _open(self):
+        self._file_started = time.time()
+        name = f"events-{time.strftime('%Y%m%dT%H%M%S', time.gmtime(self._file_started))}-{os.getpid()}-{next(_file_seq)}.parquet"
+        self._path = os.path.join(self.root, name)
+        self._writer = pq.ParquetWriter(self._path + INPROGRESS_SUFFIX, EVENT_SCHEMA, compression="zstd")
+        self._file_rows = 0
+
+    def _roll(self):
+        """Close the current file and make it visible to readers."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._path + INPROGRESS_SUFFIX, self._path)
+        self._writer = None
+        self.files += 1
+
+    # -------------------- Lifecycle / stats --------------------
+    def flush(self, timeout=10.0):
+        """Ask the writer to drain now and wait until the buffer has been taken (True) or `timeout`."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                if not self._buffer:
+                    return True
+            self._wake.set()
+            time.sleep(0.01)
+        return False
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=30)
+
+    def stats(self):
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "logged": self.logged,
+            "written": self.written,
+            "dropped": self.dropped,
+            "buffered": buffered,
+            "capacity": self.capacity,
+            "files": self.files,
+            "write_errors": self.write_errors,
+        }
+
+
+def read_events(root):
+    """All closed event files under `root` as one Arrow table (in-progress files are skipped)."""
+    paths = sorted(glob.glob(os.path.join(root, "events-*.parquet")))
+    if not paths:
+        return EVENT_SCHEMA.empty_table()
+    return pa.concat_tables([pq.read_table(p) for p in paths])
+
+
+def _bench(root, n_events, rate, capacity, batch_size):
+    """Log `n_events` at `rate` events/s (bursts every 10 ms, like reruns) and report drops / cost per call."""
+    log = EventLog(root, capacity=capacity, batch_size=batch_size, flush_interval=0.2)
+    burst = max(1, int(rate * 0.01))
+    in_log = 0.0
+    start = time.perf_counter()
+    for first in range(0, n_events, burst):
+        t0 = time.perf_counter()
+        for i in range(first, min(first + burst, n_events)):
+            log.log("impression", session_id=f"s{i % 64}", target="popular", listing_id=i)
+        in_log += time.perf_counter() - t0
+        # tidur sampai jadwal burst berikutnya (sisa waktu dipakai thread writer)
+        delay = start + (first + burst) / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - start
+    log.close()
+    stats = log.stats()
+    stats.update(
+        achieved_events_per_s=round(n_events / elapsed),
+        log_call_us=round(in_log / n_events * 1e6, 2),
+        rows_on_disk=read_events(root).num_rows,
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Event log throughput benchmark.")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=20_000, help="target events per second")
+    parser.add_argument("--capacity", type=int, default=65536)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--root", default=None, help="defaults to a temporary folder")
+    args = parser.parse_args()
+    if args.bench:
+        with tempfile.TemporaryDirectory(prefix="stay-events-") as tmp:
+            print(_bench(args.root or tmp, args.events, args.rate, args.capacity, args.batch_size))
@@ -0,0 +1,529 @@
+# loadtest.py — concurrent-session load test for main.py (runs fully offline)
+"""
+Start main.py on a local Streamlit server (fed with the synthetic dataset) and
+drive N concurrent sessions over the same websocket protocol the browser uses.
+By default all sessions hit ONE server process, so st.cache_data is shared
+exactly like in production and the server RSS growth can be attributed per
+session. With --workers N the sessions are spread round-robin over N server
+processes; --shared publishes the dataset once (shared_dataset.py) and every
+worker attaches to it, and the report then also sums PSS (proportional set
+size: shared pages split between the processes that map them) over the workers.
+With --memory-profile the servers run with STAY_MEMORY_DIAGNOSTICS
+(memory_diagnostics.py); their dump files are merged into the report (frame
+sizes per section, session state per session, top allocation sites), and
+--max-session-kb turns per-session memory growth into a failing run.
+
+Each session goes through: first paint -> email login -> filter changes ->
+property type selection -> attraction selection -> deal refresh (plain rerun).
+
+    python loadtest.py --sessions 8 --rounds 3 --rows 5000
+    python loadtest.py --sessions 8 --workers 4 --shared
+    python loadtest.py --sessions 16 --memory-profile --max-session-kb 2048
+    python loadtest.py --startup --repeats 5       # time-to-first-render on a cold server
+
+Note: streamlit.testing.v1.AppTest is not used for the concurrent part because it
+swaps a global Runtime per run (not thread-safe) and resets st.cache_data every run.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState, WidgetStates
+from streamlit.testing.v1.element_tree import parse_tree_from_messages
+from tornado.websocket import websocket_connect
+
+from dataset_store import read_listings_csv
+from event_log import read_events
+from partition_store import write_partitioned_dataset
+from shared_dataset import publish
+from synthetic_data import write_synthetic_csv
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(APP_DIR, "main.py")
+
+
+# -------------------- Server --------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_bytes(pid):
+    """Resident set size of `pid` in bytes (Linux /proc). Returns 0 when unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _pss_bytes(pid):
+    """Proportional set size of `pid` in bytes (Linux smaps_rollup). Returns 0 when unavailable."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def start_server(dataset_path, port, startup_timeout=60, extra_env=None, app_file=APP_FILE):
+    """Launch `streamlit run main.py` headless on `port` and wait for /_stcore/health."""
+    env = dict(os.environ, STAY_DATASET_PATH=dataset_path, **(extra_env or {}))
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", app_file,
+            "--server.port", str(port),
+            "--server.address", "127.0.0.1",
+            "--server.headless", "true",
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=APP_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited early with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("streamlit server did not become healthy in time")
+
+
+# -------------------- Session client --------------------
+def _latest_deltas(messages):
+    """
+    Keep only the last delta per delta_path, like the browser does. AppTest's parser
+    cannot handle a block replacing an element at the same path (e.g. a delayed
+    st.spinner that is replaced by the next container).
+    """
+    last = {}
+    for i, msg in enumerate(messages):
+        if msg.HasField("delta"):
+            last[tuple(msg.metadata.delta_path)] = i
+    keep = set(last.values())
+    return [msg for i, msg in enumerate(messages) if i in keep]
+
+
+class StaySession:
+    """
+    Minimal browser stand-in: sends rerun requests with widget states and parses
+    the ForwardMsg stream into an element tree (read-only use of AppTest's parser).
+    """
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+        self.tree = None
+        self.page_hash = ""
+        self.widgets = {}  # widget id -> WidgetState yang dikirim tiap rerun
+        self.triggers = []  # button klik hanya berlaku satu rerun
+        self.latencies = {}  # step -> [seconds]
+        self.first_delta = {}  # step -> [seconds sampai elemen pertama tampil]
+        self.errors = []
+
+    async def connect(self):
+        # hero slider mengirim gambar base64 dalam satu pesan, jadi batas default 10 MiB terlalu kecil
+        self.ws = await websocket_connect(self.url, max_message_size=256 * 2**20)
+
+    async def close(self):
+        if self.ws is not None:
+            self.ws.close()
+            self.ws = None
+
+    async def rerun(self, step):
+        state = WidgetStates()
+        state.widgets.extend(self.widgets.values())
+        state.widgets.extend(self.triggers)
+        msg = BackMsg()
+        msg.rerun_script.CopyFrom(
+            ClientState(query_string="", widget_states=state, page_script_hash=self.page_hash)
+        )
+
+        t0 = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        messages = []
+        while True:
+            raw = await asyncio.wait_for(self.ws.read_message(), self.timeout)
+            if raw is None:
+                raise ConnectionError("server closed the websocket")
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                self.page_hash = fwd.new_session.page_script_hash
+            elif kind == "script_finished":
+                break
+            elif kind == "delta" and step not in self.first_delta:
+                self.first_delta[step] = time.perf_counter() - t0
+            messages.append(fwd)
+        self.latencies.setdefault(step, []).append(time.perf_counter() - t0)
+
+        self.triggers = []
+        self.tree = parse_tree_from_messages(_latest_deltas(messages))
+        for exc in self.tree.exception:
+            self.errors.append(f"{step}: {exc.message}")
+
+    def _find(self, kind, label):
+        for w in getattr(self.tree, kind):
+            if w.label == label:
+                return w
+        return None
+
+    def options(self, kind, label):
+        w = self._find(kind, label)
+        return list(w.options) if w is not None else []
+
+    def set_string(self, kind, label, value):
+        w = self._find(kind, label)
+        if w is None:
+            return False
+        self.widgets[w.id] = WidgetState(id=w.id, string_value=str(value))
+        return True
+
+    def set_strings(self, kind, label, values):
+        w = self._find(kind, label)
+        if w is None:
+            return False
+        ws = WidgetState(id=w.id)
+        ws.string_array_value.data[:] = [str(v) for v in values]
+        self.widgets[w.id] = ws
+        return True
+
+    def click(self, label):
+        w = self._find("button", label)
+        if w is None:
+            return False
+        self.triggers.append(WidgetState(id=w.id, trigger_value=True))
+        return True
+
+
+async def run_session(url, session_id, rounds, country, timeout, seed, keep_open):
+    """Simulate one user. Returns the StaySession (never raises)."""
+    rng = random.Random(seed + session_id)
+    sess = StaySession(url, timeout)
+    try:
+        await sess.connect()
+
+        # 1. first paint (login screen)
+        await sess.rerun("first_paint")
+
+        # 2. login via email form
+        sess.set_string("text_input", "Email", f"user{session_id}@example.com")
+        if country in sess.options("selectbox", "Country"):
+            sess.set_string("selectbox", "Country", country)
+        sess.click("Sign in / Create")
+        await sess.rerun("login")
+
+        for _ in range(rounds):
+            # 3. filter changes
+            for label in ("Bedrooms", "Bathrooms", "Guests"):
+                opts = sess.options("selectbox", label)
+                if opts:
+                    sess.set_string("selectbox", label, rng.choice(opts[:3]))
+            await sess.rerun("filter_change")
+
+            # 4. property type
+            opts = sess.options("selectbox", "🏠 Choose Property Type")
+            if opts:
+                sess.set_string("selectbox", "🏠 Choose Property Type", rng.choice(opts))
+            await sess.rerun("property_type")
+
+            # 5. attractions
+            opts = sess.options("multiselect", "🏖️ Choose Nearby Attractions")
+            if opts:
+                sess.set_strings("multiselect", "🏖️ Choose Nearby Attractions", rng.sample(opts, k=rng.randint(1, 2)))
+            await sess.rerun("attractions")
+
+            # 6. special deals refresh (plain rerun)
+            await sess.rerun("deals_refresh")
+    except Exception as exc:  # harness harus tetap melaporkan sesi lain
+        sess.errors.append(f"{type(exc).__name__}: {exc}")
+    if not keep_open:
+        await sess.close()
+    return sess
+
+
+# -------------------- Time to first render --------------------
+async def _startup_session(url, country, timeout, think_s):
+    sess = StaySession(url, timeout)
+    await sess.connect()
+    try:
+        await sess.rerun("first_paint")
+        await asyncio.sleep(think_s)  # waktu user mengisi form login
+        sess.set_string("text_input", "Email", "startup@example.com")
+        if country in sess.options("selectbox", "Country"):
+            sess.set_string("selectbox", "Country", country)
+        sess.click("Sign in / Create")
+        await sess.rerun("login")
+        await sess.rerun("warm_rerun")
+    finally:
+        await sess.close()
+    return sess
+
+
+def measure_startup(repeats=3, rows=5000, country="USA", timeout=120, seed=7, dataset_path=None,
+                    app_file=APP_FILE, server_env=None, think_s=0.0):
+    """
+    Cold-start timings: a fresh server per repeat, one session. For each step the
+    time to the first rendered element and to the finished script (median of repeats).
+    `think_s` is the pause between the login screen and submitting the form.
+    """
+    tmpdir = tempfile.TemporaryDirectory(prefix="stay-startup-")
+    if dataset_path is None:
+        dataset_path = write_synthetic_csv(os.path.join(tmpdir.name, "Airbnb_Cleaned.csv"), n_rows=rows, seed=seed)
+    server_env = dict(
+        server_env or {},
+        STAY_PARTITION_ROOT=os.path.join(tmpdir.name, "partitions"),
+        STAY_EVENT_LOG_DIR=os.path.join(tmpdir.name, "events"),
+    )
+    first, full, errors = {}, {}, []
+    try:
+        for _ in range(repeats):
+            port = _free_port()
+            proc = start_server(dataset_path, port, extra_env=server_env, app_file=app_file)
+            try:
+                sess = asyncio.run(_startup_session(f"ws://127.0.0.1:{port}/_stcore/stream", country, timeout, think_s))
+                for step, vals in sess.latencies.items():
+                    full.setdefault(step, []).extend(vals)
+                for step, val in sess.first_delta.items():
+                    first.setdefault(step, []).append(val)
+                errors.extend(sess.errors)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+    finally:
+        tmpdir.cleanup()
+
+    def median_ms(vals):
+        return round(float(np.median(vals)) * 1000.0, 1)
+
+    return {
+        "app": os.path.relpath(app_file, APP_DIR),
+        "rows": rows,
+        "repeats": repeats,
+        "think_s": think_s,
+        "first_element_ms": {step: median_ms(vals) for step, vals in first.items()},
+        "script_done_ms": {step: median_ms(vals) for step, vals in full.items()},
+        "errors": errors,
+    }
+
+
+# -------------------- Report --------------------
+def _percentiles(values):
+    arr = np.asarray(values, dtype=float) * 1000.0
+    return {
+        "count": int(arr.size),
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p90_ms": round(float(np.percentile(arr, 90)), 2),
+        "p99_ms": round(float(np.percentile(arr, 99)), 2),
+        "max_ms": round(float(arr.max()), 2),
+    }
+
+
+def _memory(pids):
+    return sum(_rss_bytes(pid) for pid in pids), sum(_pss_bytes(pid) for pid in pids)
+
+
+async def _drive(urls, sessions, rounds, country, timeout, seed, server_pids):
+    # warm-up satu sesi per worker agar cache terisi, lalu ukur baseline memori
+    for url in urls:
+        await run_session(url, -1, 0, country, timeout, seed, keep_open=False)
+    await asyncio.sleep(0.5)
+    baseline = _memory(server_pids)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_session(urls[i % len(urls)], i, rounds, country, timeout, seed, keep_open=True) for i in range(sessions))
+    )
+    wall = time.perf_counter() - start
+    # sesi masih terbuka -> session_state masih hidup di server
+    live = _memory(server_pids)
+    for sess in results:
+        await sess.close()
+    return results, wall, baseline, live
+
+
+def _memory_profile(dump_dir):
+    """Merge the memory_diagnostics dumps written by the servers at exit (one per worker)."""
+    dumps = []
+    for path in sorted(glob.glob(os.path.join(dump_dir, "memory-*.json"))):
+        with open(path) as f:
+            dumps.append(json.load(f))
+    if not dumps:
+        return None
+    session_kb = [d["sessions"]["mean_kb"] for d in dumps if d["sessions"]["tracked"]]
+    frames = {}
+    for d in dumps:
+        for f in d["frames"]:
+            key = f"{f['section']}/{f['frame']}"
+            frames[key] = max(frames.get(key, 0.0), f["max_kb"])
+    return {
+        "session_state_mean_kb": round(float(np.mean(session_kb)), 1) if session_kb else 0.0,
+        "session_state_max_kb": max(d["sessions"]["max_kb"] for d in dumps),
+        "traced_peak_mb": max(d["traced_peak_mb"] for d in dumps),
+        "frame_max_kb": frames,
+        "top_sites": dumps[0]["top_sites"][:10],
+    }
+
+
+def run_load_test(sessions=8, rounds=3, rows=5000, country="USA", timeout=120, seed=7,
+                  dataset_path=None, missing_rate=0.0, port=None, server_env=None, partitioned=False,
+                  workers=1, shared=False, memory_profile=False, max_session_kb=None):
+    """
+    Run `sessions` concurrent simulated users against `workers` servers and return a report dict.
+    With `max_session_kb`, RSS growth per session above that budget is reported as an error.
+    """
+    tmpdir = tempfile.TemporaryDirectory(prefix="stay-loadtest-")
+    if dataset_path is None:
+        dataset_path = write_synthetic_csv(
+            os.path.join(tmpdir.name, "Airbnb_Cleaned.csv"), n_rows=rows, seed=seed, missing_rate=missing_rate
+        )
+    # tanpa --partitioned, arahkan ke folder kosong supaya dataset/partitions lokal tidak ikut terpakai
+    partition_root = os.path.join(tmpdir.name, "partitions")
+    if partitioned:
+        write_partitioned_dataset(read_listings_csv(dataset_path), partition_root)
+    server_env = dict(server_env or {}, STAY_PARTITION_ROOT=partition_root)
+    # event log server ke folder sementara (bukan logs/ di repo); dihitung setelah server berhenti
+    event_dir = server_env.setdefault("STAY_EVENT_LOG_DIR", os.path.join(tmpdir.name, "events"))
+    memory_dir = os.path.join(tmpdir.name, "memory")
+    if memory_profile:
+        # setiap rerun di-sample; dump ditulis server saat exit (atexit)
+        server_env.update(
+            STAY_MEMORY_DIAGNOSTICS="1", STAY_MEMORY_SAMPLE_EVERY="1",
+            STAY_MEMORY_DUMP=os.path.join(memory_dir, "memory-{pid}.json"),
+        )
+
+    shm_dir = None
+    if shared:
+        # tmpfs kalau ada (seperti produksi), selain itu folder sementara biasa
+        shm_dir = tempfile.TemporaryDirectory(prefix="stay-shared-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        publish(read_listings_csv(dataset_path), shm_dir.name)
+        server_env["STAY_SHARED_DATASET"] = shm_dir.name
+
+    ports = [port + i for i in range(workers)] if port else [_free_port() for _ in range(workers)]
+    procs = []
+    try:
+        procs = [start_server(dataset_path, p, extra_env=server_env) for p in ports]
+        urls = [f"ws://127.0.0.1:{p}/_stcore/stream" for p in ports]
+        results, wall, (baseline_rss, baseline_pss), (live_rss, live_pss) = asyncio.run(
+            _drive(urls, sessions, rounds, country, timeout, seed, [proc.pid for proc in procs])
+        )
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=30)
+        events_written = read_events(event_dir).num_rows if event_dir and os.path.isdir(event_dir) else 0
+        profile = _memory_profile(memory_dir) if memory_profile else None
+        tmpdir.cleanup()
+        if shm_dir is not None:
+            shm_dir.cleanup()
+
+    by_step = {}
+    for sess in results:
+        for step, vals in sess.latencies.items():
+            by_step.setdefault(step, []).extend(vals)
+    all_vals = [v for vals in by_step.values() for v in vals]
+    errors = [f"session {s_id}: {e}" for s_id, sess in enumerate(results) for e in sess.errors]
+    rss_per_session_kb = round((live_rss - baseline_rss) / max(1, sessions) / 1024, 1)
+    if max_session_kb is not None and rss_per_session_kb > max_session_kb:
+        errors.append(f"memory: {rss_per_session_kb} KB RSS per session > budget {max_session_kb} KB")
+
+    return {
+        "sessions": sessions,
+        "rounds": rounds,
+        "rows": rows,
+        "partitioned": partitioned,
+        "workers": workers,
+        "shared": shared,
+        "wall_s": round(wall, 3),
+        "reruns": len(all_vals),
+        "throughput_reruns_per_s": round(len(all_vals) / wall, 2) if wall > 0 else None,
+        "latency_overall": _percentiles(all_vals) if all_vals else None,
+        "latency_by_step": {step: _percentiles(vals) for step, vals in by_step.items()},
+        "memory": {
+            "server_baseline_rss_mb": round(baseline_rss / 2**20, 2),
+            "server_live_rss_mb": round(live_rss / 2**20, 2),
+            "rss_per_session_kb": rss_per_session_kb,
+            "servers_baseline_pss_mb": round(baseline_pss / 2**20, 2),
+            "servers_live_pss_mb": round(live_pss / 2**20, 2),
+        },
+        "memory_profile": profile,
+        "events_written": events_written,
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for main.py (offline).")
+    parser.add_argument("--sessions", type=int, default=8, help="number of concurrent simulated users")
+    parser.add_argument("--rounds", type=int, default=3, help="filter/attraction/deal rounds per session")
+    parser.add_argument("--rows", type=int, default=5000, help="rows in the synthetic dataset")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="share of NaNs injected in synthetic data")
+    parser.add_argument("--country", default="USA")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--dataset", default=None, help="use an existing CSV instead of synthetic data")
+    parser.add_argument("--partitioned", action="store_true", help="serve from country partitions (partition_store.py)")
+    parser.add_argument("--workers", type=int, default=1, help="server processes (sessions spread round-robin)")
+    parser.add_argument("--shared", action="store_true", help="publish the dataset once to shared memory for all workers")
+    parser.add_argument("--memory-profile", action="store_true",
+                        help="run the servers with memory diagnostics and merge their dumps into the report")
+    parser.add_argument("--max-session-kb", type=float, default=None,
+                        help="fail the run when server RSS growth per live session exceeds this budget")
+    parser.add_argument("--startup", action="store_true", help="measure cold-start time-to-first-render instead")
+    parser.add_argument("--repeats", type=int, default=3, help="cold starts for --startup")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds on the login screen for --startup")
+    parser.add_argument("--app", default=APP_FILE, help="app script for --startup (compare two versions)")
+    parser.add_argument("--out", default=None, help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        report = measure_startup(
+            repeats=args.repeats, rows=args.rows, country=args.country, timeout=args.timeout,
+            seed=args.seed, dataset_path=args.dataset, app_file=os.path.abspath(args.app), think_s=args.think,
+        )
+    else:
+        report = run_load_test(
+            sessions=args.sessions, rounds=args.rounds, rows=args.rows, country=args.country,
+            timeout=args.timeout, seed=args.seed, dataset_path=args.dataset,
+            missing_rate=args.missing_rate, port=args.port, partitioned=args.partitioned,
+            workers=args.workers, shared=args.shared,
+            memory_profile=args.memory_profile, max_session_kb=args.max_session_kb,
+        )
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
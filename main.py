@@ -7,23 +7,112 @@ import os
 import base64
 import io
 import json
+import random
+import sys
+import uuid
 import streamlit.components.v1 as components
 
+from ranking import rank_row_ids, filter_spec_key, country_pattern
+from pagination import PAGE_SIZE, loaded_ids, has_more, advance_cursor
+from dataset_store import read_listings_csv
+from partition_store import ALL_PARTITIONS, PartitionStore, catalog_is_stale, has_catalog
+from price_index import PriceIndex
+from attractions import AttractionIndex
+from normalize import DISPLAY_COLUMNS, int_options, normalize_listings
+from shared_dataset import SharedDataset, build_indexes, read_manifest
+from event_log import EventLog
+from startup import StartupPipeline
+from memory_diagnostics import MemoryDiagnostics
+
+# Path dataset bisa dioverride lewat env (dipakai loadtest.py dengan data sintetis)
+DATASET_PATH = os.environ.get("STAY_DATASET_PATH", "dataset/Airbnb_Cleaned.csv")
+
+# Dataset terpartisi per negara (partition_store.py): kalau catalog ada, hanya partisi GRID_COUNTRY yang dimuat
+# (semua partisi kalau negara itu tidak punya partisi)
+PARTITION_ROOT = os.environ.get("STAY_PARTITION_ROOT", "dataset/partitions")
+PARTITION_CACHE_MB = float(os.environ.get("STAY_PARTITION_CACHE_MB", "512"))
+# Dataset yang dipublish ke shared memory oleh shared_dataset.py (dipakai bersama oleh semua worker)
+SHARED_DATASET_ROOT = os.environ.get("STAY_SHARED_DATASET")
+# Log interaksi (event_log.py); kosongkan STAY_EVENT_LOG_DIR untuk mematikan
+EVENT_LOG_DIR = os.environ.get("STAY_EVENT_LOG_DIR", "logs/events")
+# Diagnostik memori opt-in (memory_diagnostics.py): halaman admin di ?admin=memory + file dump JSON
+MEMORY_DIAGNOSTICS = os.environ.get("STAY_MEMORY_DIAGNOSTICS", "") not in ("", "0")
+MEMORY_DUMP_PATH = os.environ.get("STAY_MEMORY_DUMP", "logs/memory/memory-{pid}.json")
+MEMORY_SAMPLE_EVERY = int(os.environ.get("STAY_MEMORY_SAMPLE_EVERY", "10"))
+# Grid, Top Activities dan histogram harga saat ini dikurasi untuk listing USA, di semua mode penyimpanan
+# (CSV, shared memory, partisi) — user yang sama melihat hasil yang sama. Special Deals memakai seluruh dataset.
+GRID_COUNTRY = "USA"
+
 # -------------------- Helpers --------------------
-@st.cache_data
-def load_data(path="dataset/Airbnb_Cleaned.csv"):
+@st.cache_resource
+def get_partition_store(root, max_mb, csv_path):
     """
-    Load CSV safely. If parse_dates columns don't exist, load without parse_dates.
+    Process-wide PartitionStore, or None (use the single CSV) when `root` has no catalog
+    or the catalog is stale for `csv_path` — a stale catalog is reported once per process.
     """
-    try:
-        df = pd.read_csv(
-            path,
-            parse_dates=["first_review", "host_since", "last_review", "available_date"],
-            low_memory=False,
-        )
-    except Exception:
-        df = pd.read_csv(path, low_memory=False)
-    return df
+    if not has_catalog(root):
+        return None
+    stale = catalog_is_stale(root, csv_path)
+    if stale:
+        print(f"[partition_store] ignoring partitions: {stale}; rebuild with "
+              f"`python partition_store.py --csv {csv_path} --out {root}`", file=sys.stderr)
+        return None
+    return PartitionStore(root, max_bytes=int(max_mb * 2**20))
+
+
+@st.cache_resource(max_entries=2)
+def attach_shared_dataset(root, version, _manifest):
+    """
+    Read-only, zero-copy attach to a published version (one mapping per process, shared by sessions).
+    Opens exactly the version of `_manifest`, not whatever is current by the time the cache misses.
+    """
+    return SharedDataset(root, _manifest)
+
+
+@st.cache_resource
+def get_event_log(root):
+    """Process-wide EventLog (ring buffer + background writer), or None when disabled."""
+    return EventLog(root) if root else None
+
+
+def current_session_id():
+    """Stable id of the browser session (event log + memory diagnostics)."""
+    return st.session_state.setdefault("_session_id", uuid.uuid4().hex)
+
+
+def log_event(event, target=None, value=None, listing_id=None):
+    """Record one interaction for the current session. Non-blocking; no-op when logging is off."""
+    events = get_event_log(EVENT_LOG_DIR)
+    if events is not None:
+        events.log(event, current_session_id(), target=target, value=value, listing_id=listing_id)
+
+
+@st.cache_resource
+def get_memory_diagnostics(enabled, dump_path, sample_every):
+    """Process-wide MemoryDiagnostics (starts tracemalloc), or None when diagnostics are off."""
+    if not enabled:
+        return None
+    return MemoryDiagnostics(dump_path.replace("{pid}", str(os.getpid())), sample_every=sample_every)
+
+
+def track_frames(section, once=False, **frames):
+    """Sample deep memory_usage of DataFrames per app section; no-op unless diagnostics are on."""
+    if memory_sampled:
+        memory_diag.record_frames(section, once=once, **frames)
+
+
+def track_session():
+    """Sample the deep size of this session's st.session_state; no-op unless diagnostics are on."""
+    if memory_sampled:
+        memory_diag.record_session(current_session_id(), st.session_state.to_dict())
+
+
+def _log_widget(event, target, key):
+    """on_change callback: log the new value of widget `key`."""
+    value = st.session_state.get(key)
+    if isinstance(value, (list, tuple)):
+        value = "|".join(str(v) for v in value)
+    log_event(event, target=target, value=value)
 
 
 def short_name_from_email(email):
@@ -39,6 +128,16 @@ def img_file_to_base64(path):
     return base64.b64encode(data).decode("utf-8")
 
 
+def img_file_to_data_uri(path):
+    """Local image -> data URI (mime from the extension); http(s) URLs are returned as-is."""
+    if isinstance(path, str) and path.startswith("http"):
+        return path
+    mime = {".png": "image/png", ".webp": "image/webp", ".gif": "image/gif"}.get(
+        os.path.splitext(path)[1].lower(), "image/jpeg"
+    )
+    return f"data:{mime};base64,{img_file_to_base64(path)}"
+
+
 def gather_local_images(img_dir="images", bases=None, limit=10):
     """
     Return list of image paths (local or remote fallback).
@@ -66,15 +165,309 @@ def gather_local_images(img_dir="images", bases=None, limit=10):
     return images
 
 
+def countries_cache_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".countries.json"
+
+
+def countries_cache_is_fresh(csv_path):
+    """True when the login country list cached next to the CSV is at least as new as the CSV."""
+    cache = countries_cache_path(csv_path)
+    return os.path.exists(csv_path) and os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(csv_path)
+
+
+def read_countries_cache(csv_path):
+    with open(countries_cache_path(csv_path)) as f:
+        return json.load(f)
+
+
+def dataset_countries(frame, csv_path):
+    """
+    Country list for the login form, taken from the parsed dataset (no second CSV parse)
+    and cached next to the CSV, so the next cold start shows the login form without waiting.
+    """
+    countries = sorted(frame["country"].dropna().astype(str).unique()) if "country" in frame.columns else ["Indonesia"]
+    cache = countries_cache_path(csv_path)
+    tmp_path = f"{cache}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(countries, f)
+        os.replace(tmp_path, cache)
+    except OSError:
+        pass  # folder dataset read-only: cukup tanpa cache
+    return countries
+
+
+def _hero_sources(*uris):
+    return list(uris) or ["https://picsum.photos/1920/1080"]
+
+
+@st.cache_resource
+def get_startup(dataset_path, load_csv):
+    """
+    Per-process startup pipeline (startup.py): logo, hero images, banner and, in
+    single-CSV mode, the dataset + its indexes are prepared concurrently. Each
+    section waits only for its own results.
+    """
+    pipeline = StartupPipeline()
+    if os.path.exists("images/logo.png"):
+        pipeline.submit("logo", img_file_to_base64, "images/logo.png")
+
+    hero_jobs = []
+    for i, path in enumerate(gather_local_images(img_dir="images", bases=["image1", "image2", "image3"], limit=12)):
+        hero_jobs.append(f"hero:{i}")
+        pipeline.submit(hero_jobs[-1], img_file_to_data_uri, path)
+    pipeline.submit("hero", _hero_sources, after=tuple(hero_jobs))
+
+    if os.path.exists("images/image4.png"):
+        pipeline.submit("banner", img_file_to_base64, "images/image4.png")
+
+    if load_csv:
+        pipeline.submit("dataset", read_listings_csv, dataset_path)
+        # layar login hanya butuh daftar negara: dari cache di samping CSV kalau masih baru (first paint tidak
+        # menunggu dataset), selain itu dari dataset yang sudah diparse — CSV tidak pernah diparse dua kali
+        if countries_cache_is_fresh(dataset_path):
+            pipeline.submit("countries", read_countries_cache, dataset_path)
+        else:
+            pipeline.submit("countries", dataset_countries, dataset_path, after=("dataset",))
+        pipeline.submit("indexes", build_indexes, after=("dataset",))
+        pipeline.submit(
+            "price_index",
+            lambda frame, indexes: PriceIndex(frame, positions=indexes["price_positions"]),
+            after=("dataset", "indexes"),
+        )
+        pipeline.submit("attractions", lambda frame: AttractionIndex(frame["specification"]), after=("dataset",))
+    return pipeline
+
+
+def startup_result(name, fallback=None):
+    """Result of a startup job, `fallback` if the job doesn't exist or failed (e.g. missing image)."""
+    if name not in startup:
+        return fallback
+    try:
+        return startup.result(name)
+    except OSError:
+        return fallback
+
+
+# Tiap entri = satu array id (8 byte x kandidat) dan kunci spec ikut nilai slider harga, jadi jumlah spec
+# praktis tak terbatas: cache dibatasi kecil (32 x 100k kandidat ~ 25 MB per proses) + TTL. Cache miss murah
+# (memfilter rank_order global, tanpa sort).
+@st.cache_resource(max_entries=32, ttl=600)
+def ranked_ids_for(spec_key, _frame, _order=None):
+    """Ranked ids for one filter spec, computed once and shared (read-only) by all sessions."""
+    return rank_row_ids(_frame, order=_order)
+
+
+@st.cache_resource(max_entries=64)
+def get_row_indexes(source_key, _frame):
+    """Rank / price / geo order of a data source (already precomputed in shared-memory mode)."""
+    return build_indexes(_frame)
+
+
+@st.cache_resource(max_entries=64)
+def get_filter_options(source_key, _frame):
+    """Dropdown values for bedrooms / bathrooms / guests, computed once per data source."""
+    defaults = {"bedrooms": [1, 2, 3], "bathrooms": [1, 2, 3], "beds": [1, 2, 3, 4]}
+    return {
+        col: int_options(_frame[col], default) if col in _frame.columns else default
+        for col, default in defaults.items()
+    }
+
+
+@st.cache_resource(max_entries=64)
+def get_price_index(source_key, _frame, _positions=None):
+    """Sorted price index + histograms, built once per data source and shared by all sessions."""
+    return PriceIndex(_frame, positions=_positions)
+
+
+@st.cache_resource(max_entries=8)
+def get_attraction_index(source_key, _frame):
+    """Attraction taxonomy + per-phrase row bitmaps, rebuilt from the data once per data source."""
+    return AttractionIndex(_frame["specification"])
+
+
+def render_stay_card(row, show_prices=True, show_spec=False):
+    """
+    One listing card (thumbnail, name, rooms, rating, then prices or specification).
+    Only reads the display_* text fields prepared at load time (normalize.py).
+    """
+    st.image(row["display_thumb"] or "https://picsum.photos/300/200", use_container_width=True)
+    st.markdown(f"**{row['display_name']}**")
+    st.markdown(f"🛏️ {row['display_bedrooms']} Bedroom | 🛁 {row['display_bathrooms']} Bathroom")
+    st.markdown(f"👨‍👩‍👧 {row['display_beds']} Guests")
+
+    # Rating dan jumlah review
+    st.markdown(f"⭐ **{row['display_rating']}** ({row['display_reviews']})")
+
+    if show_prices:
+        # Harga lama (dicoret)
+        st.markdown(
+            f"<span style='color:gray;text-decoration:line-through;'>Was: {row['display_was_price']}</span>",
+            unsafe_allow_html=True
+        )
+
+        # Harga baru (teks tebal & warna oranye)
+        st.markdown(
+            f"<span style='font-weight:700;color:orange;'>Now: {row['display_price']}</span>",
+            unsafe_allow_html=True
+        )
+
+    if show_spec:
+        st.markdown(f"<span style='color:gray;font-size:13px;'>{row['specification']}</span>", unsafe_allow_html=True)
+
+
+def bundle_cards(pair_rows):
+    """
+    Display text of the Special Deals bundles (rows 2k and 2k+1 of `pair_rows` form
+    one bundle). Pairs are drawn per rerun, so unlike the display_* fields this can't
+    be prepared at load time; the totals and text are computed for all bundles in one
+    vectorized pass, and the render loop only prints strings.
+    """
+    was = np.nan_to_num(pair_rows["was_price"].to_numpy(dtype=float, na_value=np.nan)).reshape(-1, 2)
+    price = np.nan_to_num(pair_rows["log_price"].to_numpy(dtype=float, na_value=np.nan)).reshape(-1, 2)
+    total_was, total_price = was.sum(axis=1), price.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        save = np.where(total_was > 0, (1 - total_price / total_was) * 100, 0.0)
+
+    def money(values):
+        return pd.Series(values.ravel()).map("$ {:,.0f}".format).to_numpy(dtype=object).reshape(values.shape)
+
+    was_text, total_was_text, now_text = money(was), money(total_was), money(total_price)
+    save_text = pd.Series(save).map("{:.1f}%".format).to_numpy(dtype=object)
+    names = pair_rows["name"].to_numpy(dtype=object).reshape(-1, 2)
+    specs = pair_rows["specification"].to_numpy(dtype=object).reshape(-1, 2)
+    thumbs = pair_rows["display_thumb"].to_numpy(dtype=object)[::2]
+    return [
+        {
+            "thumb": thumbs[k],
+            "listings": list(zip(names[k], specs[k])),
+            "was": f"{was_text[k, 0]} + {was_text[k, 1]} = {total_was_text[k]}",
+            "now": now_text[k],
+            "save": save_text[k],
+        }
+        for k in range(len(names))
+    ]
+
+
+def _load_more(grid_key, cursor_key, ranked, spec_key):
+    st.session_state[cursor_key] = advance_cursor(ranked, st.session_state.get(cursor_key), spec_key)
+    log_event("show_more", target=grid_key)
+
+
+def log_impressions(target, listing_ids):
+    """One impression event per listing id, queued as a batch. No-op when logging is off."""
+    events = get_event_log(EVENT_LOG_DIR)
+    if events is not None and len(listing_ids):
+        events.log_many("impression", current_session_id(), listing_ids, target=target)
+
+
+def _log_new_impressions(grid_key, frame, spec_key, ids):
+    """
+    Log impressions only for cards that are newly shown: everything on the first
+    render of `spec_key`, then only the page added by "Show more". Reruns that
+    leave the grid unchanged (another widget, scrolling) log nothing.
+    """
+    if get_event_log(EVENT_LOG_DIR) is None:
+        return
+    shown_key = f"_shown_{grid_key}"
+    shown_spec, n_shown = st.session_state.get(shown_key, (None, 0))
+    if shown_spec != spec_key:
+        n_shown = 0
+    new_ids = np.asarray(ids)[n_shown:]
+    if len(new_ids):
+        log_impressions(grid_key, frame.loc[new_ids, "id"].tolist() if "id" in frame.columns else new_ids.tolist())
+    st.session_state[shown_key] = (spec_key, len(ids))
+
+
+def render_paged_grid(grid_key, frame, spec_key, show_prices=True, show_spec=False, order=None):
+    """
+    Grid over the ranked ids of `frame`, PAGE_SIZE cards per row, with a "Show more"
+    button. Only the cursor is kept in session_state; `spec_key` must identify `frame`.
+    `order` is the data source's global rank_order (frame is then ranked without sorting).
+    """
+    ranked = ranked_ids_for(spec_key, frame, order)
+    cursor_key = f"_cursor_{grid_key}"
+    cursor = st.session_state.get(cursor_key)
+    # hanya kolom display_* (string) yang diambil — tanpa konversi tipe per baris
+    ids = loaded_ids(ranked, cursor, spec_key)
+    rows = frame.loc[ids, DISPLAY_COLUMNS].to_dict("records")
+    _log_new_impressions(grid_key, frame, spec_key, ids)
+
+    for start in range(0, len(rows), PAGE_SIZE):
+        cols = st.columns(PAGE_SIZE, gap="medium")
+        for idx, row in enumerate(rows[start:start + PAGE_SIZE]):
+            with cols[idx]:
+                render_stay_card(row, show_prices=show_prices, show_spec=show_spec)
+
+    if has_more(ranked, cursor, spec_key):
+        st.button("Show more", key=f"more_{grid_key}", on_click=_load_more, args=(grid_key, cursor_key, ranked, spec_key))
+
+
+def render_memory_page(diag):
+    """Admin page (?admin=memory): per-section frame sizes, session state sizes, top allocation sites."""
+    st.title("🧠 Memory diagnostics")
+    report = diag.report()
+
+    cols = st.columns(4)
+    cols[0].metric("Traced now", f"{report['traced_current_mb']} MB")
+    cols[1].metric("Traced peak", f"{report['traced_peak_mb']} MB")
+    cols[2].metric("Sessions tracked", report["sessions"]["tracked"])
+    cols[3].metric("Session state (mean / max)", f"{report['sessions']['mean_kb']} / {report['sessions']['max_kb']} KB")
+    st.caption(f"pid {report['pid']} · uptime {report['uptime_s']} s · {report['reruns']} reruns, "
+               f"sampled every {report['sample_every']}")
+
+    st.subheader("DataFrames per section (memory_usage deep)")
+    st.dataframe(pd.DataFrame(report["frames"]), hide_index=True)
+    st.subheader("Top allocation sites")
+    st.dataframe(pd.DataFrame(report["top_sites"]), hide_index=True)
+    st.subheader("Growth since diagnostics started")
+    st.dataframe(pd.DataFrame(report["top_growth"]), hide_index=True)
+
+    st.subheader("Startup jobs (s since process start)")
+    st.dataframe(
+        pd.DataFrame(
+            [{"job": name, "start_s": start, "end_s": end} for name, (start, end) in sorted(startup.timings().items())]
+        ),
+        hide_index=True,
+    )
+
+    st.subheader("Caches")
+    events = get_event_log(EVENT_LOG_DIR)
+    st.json({
+        "partition_store": partition_store.stats() if partition_store is not None else None,
+        "shared_dataset": shared_manifest,
+        "event_log": events.stats() if events is not None else None,
+    })
+
+    if st.button("Write dump file"):
+        path = diag.dump()
+        if path:
+            st.success(f"Written to {path}")
+        else:
+            st.warning("STAY_MEMORY_DUMP is empty — use the download button instead.")
+    st.download_button("Download report (JSON)", json.dumps(report, indent=2), file_name=f"memory-{report['pid']}.json")
+
+
 # -------------------- App config --------------------#
 st.set_page_config(page_title="Personalized Stay — Friendly Travel", layout="wide")
 
+# Dibuat sebelum startup pipeline supaya alokasi dataset ikut ter-trace
+memory_diag = get_memory_diagnostics(MEMORY_DIAGNOSTICS, MEMORY_DUMP_PATH, MEMORY_SAMPLE_EVERY)
+memory_sampled = memory_diag is not None and memory_diag.tick()
+
+# -------------------- Startup pipeline (dataset, index, dan aset disiapkan paralel) --------------------
+# Prioritas data: shared memory (shared_dataset.py) -> partisi negara -> CSV tunggal
+shared_manifest = read_manifest(SHARED_DATASET_ROOT) if SHARED_DATASET_ROOT else None
+partition_store = None if shared_manifest else get_partition_store(PARTITION_ROOT, PARTITION_CACHE_MB, DATASET_PATH)
+startup = get_startup(DATASET_PATH, load_csv=shared_manifest is None and partition_store is None)
+
+# -------------------- Admin: memory diagnostics (hanya jika STAY_MEMORY_DIAGNOSTICS aktif) --------------------
+if memory_diag is not None and st.query_params.get("admin") == "memory":
+    render_memory_page(memory_diag)
+    st.stop()
+
 # -------------------- Large fixed navbar with logo (place right after st.set_page_config(...)) --------------------
-logo_path = "images/logo.png"
-if os.path.exists(logo_path):
-    img_b64 = img_file_to_base64(logo_path)
-else:
-    img_b64 = ""  # empty fallback
+img_b64 = startup_result("logo", "")  # empty fallback
 
 # Navbar sizes (adjust to taste)
 NAV_HEIGHT_PX = 92
@@ -286,24 +679,37 @@ st.markdown(
     unsafe_allow_html=True,
 )
 # -------------------- Load dataset --------------------
-with st.spinner("Loading dataset..."):
-    try:
-        df = load_data()
-    except FileNotFoundError:
-        st.error("Dataset file not found at dataset/Airbnb_Cleaned.csv — showing empty sample.")
-        df = pd.DataFrame(
-            {
-                "id": range(1, 11),
-                "name": [f"Hotel {i}" for i in range(1, 11)],
-                "thumbnail_url": [None, *[f"https://picsum.photos/seed/{i}/600/400" for i in range(1, 10)]],
-                "review_scores_rating": np.random.randint(60, 100, 10),
-                "number_of_reviews": np.random.randint(0, 500, 10),
-                "was_price": [None] + list(np.random.randint(50, 500, 9)),
-                "log_price": np.random.uniform(30, 400, 10),
-                "country": ["USA", "Indonesia", "USA", "France", "USA", "Japan", "Indonesia", "USA", "Spain", "USA"],
-                "property_type": ["Apartment", "House", "Apartment", "B&B", "Apartment", "Villa", "Apartment", "Hostel", "House", "Resort"],
-            }
-        )
+shared_dataset = attach_shared_dataset(SHARED_DATASET_ROOT, shared_manifest["version"], shared_manifest) if shared_manifest else None
+data_source = DATASET_PATH  # identitas data untuk kunci cache ranking
+from_startup = False  # df = dataset dari startup pipeline (index-nya sudah dibangun di sana)
+
+if shared_dataset is not None:
+    # frame read-only di atas mmap — jangan dimodifikasi in place
+    df = shared_dataset.frame
+    data_source = f"shm:{SHARED_DATASET_ROOT}@{shared_dataset.version}"
+elif partition_store is not None:
+    df = None  # partisi negara dimuat setelah login
+else:
+    with st.spinner("Loading dataset..."):
+        try:
+            login_countries = startup.result("countries")
+            df = None  # dataset lengkap dari startup pipeline ditunggu setelah login
+        except FileNotFoundError:
+            st.error(f"Dataset file not found at {DATASET_PATH} — showing empty sample.")
+            df = pd.DataFrame(
+                {
+                    "id": range(1, 11),
+                    "name": [f"Hotel {i}" for i in range(1, 11)],
+                    "thumbnail_url": [None, *[f"https://picsum.photos/seed/{i}/600/400" for i in range(1, 10)]],
+                    "review_scores_rating": np.random.randint(60, 100, 10),
+                    "number_of_reviews": np.random.randint(0, 500, 10),
+                    "was_price": [None] + list(np.random.randint(50, 500, 9)),
+                    "log_price": np.random.uniform(30, 400, 10),
+                    "country": ["USA", "Indonesia", "USA", "France", "USA", "Japan", "Indonesia", "USA", "Spain", "USA"],
+                    "property_type": ["Apartment", "House", "Apartment", "B&B", "Apartment", "Villa", "Apartment", "Hostel", "House", "Resort"],
+                }
+            )
+            df, _ = normalize_listings(df)
 
 # -------------------- Session state defaults --------------------
 if "logged_in" not in st.session_state:
@@ -330,12 +736,14 @@ if not st.session_state.logged_in:
             if st.button("🌐 Continue with Google"):
                 st.session_state.user_email = "guest_google@example.com"
                 st.session_state.logged_in = True
+                log_event("login", target="google")
                 st.success("Signed in as guest_google@example.com")
                 
         with col2:
             if st.button("📘 Continue with Facebook"):
                 st.session_state.user_email = "guest_facebook@example.com"
                 st.session_state.logged_in = True
+                log_event("login", target="facebook")
                 st.success("Signed in as guest_facebook@example.com")
                 
 
@@ -344,7 +752,12 @@ if not st.session_state.logged_in:
 
         with st.form("email_form"):
             email = st.text_input("Email", placeholder="name@email.com")
-            countries = sorted(df["country"].dropna().unique()) if "country" in df.columns else ["Indonesia"]
+            if partition_store is not None:
+                countries = partition_store.countries()
+            elif df is None:
+                countries = login_countries
+            else:
+                countries = sorted(df["country"].dropna().unique()) if "country" in df.columns else ["Indonesia"]
             country = st.selectbox("Country", options=countries)
             st.write("_with phone number_")
             submit = st.form_submit_button("Sign in / Create")
@@ -352,12 +765,42 @@ if not st.session_state.logged_in:
                 st.session_state.user_email = email if email else "guest_user@example.com"
                 st.session_state.user_country = country
                 st.session_state.logged_in = True
+                log_event("login", target="email", value=country)
                 st.success(f"Welcome, {short_name_from_email(st.session_state.user_email)}!")
                 login_placeholder.empty()
 
 if not st.session_state.logged_in:
+    track_session()
     st.stop()
 
+# Muat hanya partisi yang dipakai section-section di bawah (lazy, dibagi antar sesi — jangan dimodifikasi)
+if partition_store is not None:
+    with st.spinner("Loading dataset..."):
+        # Tanpa partisi GRID_COUNTRY: semua partisi, sama seperti fallback CSV / shared memory ke semua negara
+        if partition_store.has_partition(GRID_COUNTRY):
+            partition_key = partition_store.key_for(GRID_COUNTRY)
+            df = partition_store.load(GRID_COUNTRY)
+        else:
+            partition_key = ALL_PARTITIONS
+            df = partition_store.load_all()
+    data_source = f"{PARTITION_ROOT}@{partition_store.version}/{partition_key}"
+elif df is None:
+    # CSV tunggal: biasanya sudah selesai diparse (paralel) selama user mengisi form login
+    with st.spinner("Loading dataset..."):
+        df = startup.result("dataset")
+    from_startup = True
+
+# Urutan rank / harga / lokasi: dari shared memory kalau ada, selain itu dihitung sekali per data source
+if shared_dataset is not None:
+    row_indexes = shared_dataset.indexes
+elif from_startup:
+    row_indexes = startup.result("indexes")
+else:
+    row_indexes = get_row_indexes(data_source, df)
+# Dataset + index dipakai bersama oleh semua sesi -> cukup diukur sekali per data source
+track_frames("dataset", once=True, **{data_source: df})
+track_frames("indexes", once=True, **{f"{name}@{data_source}": row_indexes[name] for name in row_indexes})
+
 # -------------------- Main header --------------------
 user_name = short_name_from_email(st.session_state.user_email)
 user_country = st.session_state.user_country if st.session_state.user_country else "your country"
@@ -371,30 +814,8 @@ st.markdown("</div>", unsafe_allow_html=True)
 st.write("\n")
 
 # -------------------- Fixed-height Hero / Image Slider --------------------
-local_images = gather_local_images(img_dir="images", bases=["image1", "image2", "image3"], limit=12)
-
-# Build src list (local -> data URI, remote as-is)
-src_list = []
-for p in local_images:
-    try:
-        if isinstance(p, str) and p.startswith("http"):
-            src_list.append(p)
-        else:
-            ext = os.path.splitext(p)[1].lower()
-            mime = "image/jpeg"
-            if ext == ".png":
-                mime = "image/png"
-            elif ext == ".webp":
-                mime = "image/webp"
-            elif ext == ".gif":
-                mime = "image/gif"
-            b64 = img_file_to_base64(p)
-            src_list.append(f"data:{mime};base64,{b64}")
-    except Exception:
-        src_list.append("https://picsum.photos/1920/1080")
-
-if not src_list:
-    src_list = ["https://picsum.photos/1920/1080"]
+# Data URI gambar lokal sudah disiapkan di startup pipeline (sekali per proses)
+src_list = startup_result("hero", ["https://picsum.photos/1920/1080"])
 
 # Fixed hero height in pixels to keep iframe stable and avoid whitespace/shape shifts on zoom.
 HERO_HEIGHT_PX = 600  # adjust if desired (desktop comfortable default)
@@ -500,6 +921,16 @@ html = f"""
 components.html(html, height=HERO_HEIGHT_PX, scrolling=False)
 st.markdown("---")
 
+# -------------------- Filter Country --------------------
+# Mask posisi baris di df — dipakai histogram harga dan Top Activities
+# (bitmap atraksi juga per posisi baris df, jadi cukup di-AND)
+if "country" in df.columns:
+    country_mask = df["country"].str.contains(country_pattern(GRID_COUNTRY), case=False, na=False).to_numpy(dtype=bool)
+    if not country_mask.any():
+        country_mask = np.ones(len(df), dtype=bool)
+else:
+    country_mask = np.ones(len(df), dtype=bool)
+
 # -------------------- Filter Card Section --------------------
 st.markdown("### 🏠 Find Your Perfect Stay")
 
@@ -511,61 +942,93 @@ with st.container():
 
     with col2:
         st.markdown("📅 **Date**")
-        selected_date = st.date_input("Select Date", value=pd.Timestamp("2025-10-25"), label_visibility="collapsed")
+        selected_date = st.date_input(
+            "Select Date", value=pd.Timestamp("2025-10-25"), label_visibility="collapsed",
+            key="filter_date", on_change=_log_widget, args=("filter", "date", "filter_date"),
+        )
 
     with col3:
         st.markdown("🌙 **Night Stay**")
-        night_stay = st.selectbox("Night Stay", list(range(1, 31)), index=2, label_visibility="collapsed")
+        night_stay = st.selectbox(
+            "Night Stay", list(range(1, 31)), index=2, label_visibility="collapsed",
+            key="filter_nights", on_change=_log_widget, args=("filter", "nights", "filter_nights"),
+        )
 
     st.markdown("<br>", unsafe_allow_html=True)
     col4, col5, col6 = st.columns(3)
 
-    # Gunakan nilai minimum dari data agar dropdown dinamis
-    def get_unique_int_values(series, default=[1, 2, 3]):
-        try:
-            vals = series.dropna().astype(float).astype(int).unique()
-            return sorted(set(vals))
-        except Exception:
-            return default
+    # Nilai dropdown diambil dari data (dihitung sekali per data source, bukan per rerun)
+    filter_options = get_filter_options(data_source, df)
 
     with col4:
         st.markdown("🛏️ **Bedrooms**")
-        bedroom_options = get_unique_int_values(df["bedrooms"]) if "bedrooms" in df.columns else [1, 2, 3]
-        selected_bedroom = st.selectbox("Bedrooms", bedroom_options, label_visibility="collapsed")
+        selected_bedroom = st.selectbox(
+            "Bedrooms", filter_options["bedrooms"], label_visibility="collapsed",
+            key="filter_bedrooms", on_change=_log_widget, args=("filter", "bedrooms", "filter_bedrooms"),
+        )
 
     with col5:
         st.markdown("🛁 **Bathrooms**")
-        bathroom_options = get_unique_int_values(df["bathrooms"]) if "bathrooms" in df.columns else [1, 2, 3]
-        selected_bathroom = st.selectbox("Bathrooms", bathroom_options, label_visibility="collapsed")
+        selected_bathroom = st.selectbox(
+            "Bathrooms", filter_options["bathrooms"], label_visibility="collapsed",
+            key="filter_bathrooms", on_change=_log_widget, args=("filter", "bathrooms", "filter_bathrooms"),
+        )
 
     with col6:
         st.markdown("👨‍👩‍👧 **Guests (Adults)**")
-        bed_options = get_unique_int_values(df["beds"]) if "beds" in df.columns else [1, 2, 3, 4]
-        selected_beds = st.selectbox("Guests", bed_options, label_visibility="collapsed")
+        selected_beds = st.selectbox(
+            "Guests", filter_options["beds"], label_visibility="collapsed",
+            key="filter_beds", on_change=_log_widget, args=("filter", "beds", "filter_beds"),
+        )
 
+    # -------------------- Apply Filters to Dataset --------------------
+    # Semua filter digabung jadi satu mask, lalu baris diambil sekali (tanpa salinan per filter).
+    # Dihitung sebelum slider harga supaya histogram + jumlah hasil memakai filter yang sama dengan grid.
+    filter_mask = np.ones(len(df), dtype=bool)
 
-    st.markdown("</div>", unsafe_allow_html=True)
+    # Filter by available_date (jika ada; sudah datetime sejak load)
+    if "available_date" in df.columns:
+        filter_mask &= (df["available_date"] <= pd.Timestamp(selected_date)).to_numpy()
 
-# -------------------- Apply Filters to Dataset --------------------
-filtered_main = df.copy()
+    # Bedrooms / Bathrooms / Beds filter (>=, kosong dibaca 0 seperti baseline)
+    for col, minimum in (("bedrooms", selected_bedroom), ("bathrooms", selected_bathroom), ("beds", selected_beds)):
+        if col in df.columns:
+            filter_mask &= (df[col].fillna(0.0) >= minimum).to_numpy()
 
-# Filter by available_date (jika ada)
-if "available_date" in filtered_main.columns:
-    filtered_main = filtered_main[
-        (pd.to_datetime(filtered_main["available_date"], errors="coerce") <= pd.to_datetime(selected_date))
-    ]
+    # -------------------- Price Range (histogram + jumlah hasil dari index) --------------------
+    if from_startup:
+        price_index = startup.result("price_index")
+    else:
+        price_index = get_price_index(data_source, df, row_indexes["price_positions"])
+    price_floor = float(np.floor(price_index.min_price))
+    price_ceil = max(float(np.ceil(price_index.max_price)), price_floor + 1)
+    # Kandidat grid Most Popular sebelum filter harga (fallback ke semua negara sama seperti usa_df)
+    price_scope = filter_mask & country_mask
+    if not price_scope.any():
+        price_scope = filter_mask
+
+    st.markdown("💵 **Price per Night**")
+    selected_price = st.slider(
+        "Price per Night", min_value=price_floor, max_value=price_ceil,
+        value=(price_floor, price_ceil), step=1.0, format="$%.0f", label_visibility="collapsed",
+        key="filter_price", on_change=_log_widget, args=("filter", "price", "filter_price"),
+    )
+    price_counts, price_edges = price_index.histogram(price_scope)
+    st.bar_chart(
+        pd.DataFrame({"stays": price_counts}, index=pd.Index(price_edges[:-1].round(0), name="price")),
+        height=140,
+    )
+    st.caption(f"{price_index.count(*selected_price, mask=price_scope):,} stays match your filters in this price range")
+    price_filter_active = selected_price != (price_floor, price_ceil)
 
-# Bedrooms filter (>=)
-if "bedrooms" in filtered_main.columns:
-    filtered_main = filtered_main[filtered_main["bedrooms"].fillna(0) >= selected_bedroom]
+    st.markdown("</div>", unsafe_allow_html=True)
 
-# Bathrooms filter (>=)
-if "bathrooms" in filtered_main.columns:
-    filtered_main = filtered_main[filtered_main["bathrooms"].fillna(0) >= selected_bathroom]
+# Price range (binary search di price index)
+if price_filter_active:
+    filter_mask &= price_index.range_mask(*selected_price)
 
-# Beds filter (>=)
-if "beds" in filtered_main.columns:
-    filtered_main = filtered_main[filtered_main["beds"].fillna(0) >= selected_beds]
+filtered_main = df[filter_mask]
+track_frames("filters", filtered_main=filtered_main)
 
 st.markdown("---")
 
@@ -575,222 +1038,113 @@ st.write("Find the highest-rated stays across different property types — curat
 
 # -------------------- Filter USA Data (setelah filter card) --------------------
 if "country" in filtered_main.columns:
-    usa_mask = filtered_main["country"].str.contains("USA|United States|America", case=False, na=False)
-    usa_df = filtered_main[usa_mask].copy() if usa_mask.sum() > 0 else filtered_main.copy()
+    usa_mask = filtered_main["country"].str.contains(country_pattern(GRID_COUNTRY), case=False, na=False)
+    usa_df = filtered_main[usa_mask] if usa_mask.sum() > 0 else filtered_main
 else:
-    usa_df = filtered_main.copy()
+    usa_df = filtered_main
 
 
-# Pastikan kolom utama ada
+# Pastikan kolom utama ada (assign = frame baru, data bersama tidak diubah)
 required_cols = ["property_type", "review_scores_rating", "number_of_reviews", "thumbnail_url", "name", "log_price", "was_price"]
-for col in required_cols:
-    if col not in usa_df.columns:
-        usa_df[col] = None
+missing_cols = [col for col in required_cols if col not in usa_df.columns]
+if missing_cols:
+    usa_df = usa_df.assign(**{col: None for col in missing_cols})
 
 # -------------------- Dropdown Property Type --------------------
 property_types = sorted(usa_df["property_type"].dropna().unique().tolist())
-selected_property = st.selectbox("🏠 Choose Property Type", property_types)
+selected_property = st.selectbox(
+    "🏠 Choose Property Type", property_types,
+    key="filter_property_type", on_change=_log_widget, args=("property_type", None, "filter_property_type"),
+)
 
 # -------------------- Filter per Property Type --------------------
-filtered_df = usa_df[usa_df["property_type"] == selected_property].copy()
+filtered_df = usa_df[usa_df["property_type"] == selected_property]
+track_frames("top_stays", usa_df=usa_df, filtered_df=filtered_df)
+
+# Spec filter yang menentukan isi grid (kunci cache ranking + cursor)
+filter_spec = dict(
+    dataset=data_source,
+    date=str(selected_date),
+    bedrooms=selected_bedroom,
+    bathrooms=selected_bathroom,
+    beds=selected_beds,
+    price=selected_price if price_filter_active else None,
+)
 
 if filtered_df.empty:
     st.warning(f"No listings available for property type: {selected_property}")
 else:
-    # Urutkan berdasarkan rating tertinggi, lalu review terbanyak
-    filtered_df = filtered_df.sort_values(
-        ["review_scores_rating", "number_of_reviews"],
-        ascending=[False, False]
-    ).head(5)
-
-    st.markdown(f"### 🌟 Top 5 **{selected_property}** in the **{user_country}**")
+    # Urutkan berdasarkan rating tertinggi, lalu review terbanyak (lihat ranking.py)
+    st.markdown(f"### 🌟 Top **{selected_property}** in the **{user_country}**")
 
     # -------------------- Display Grid --------------------
-    cols = st.columns(5, gap="medium")
-
-    for idx, (_, row) in enumerate(filtered_df.iterrows()):
-        with cols[idx % 5]:
-            thumb = row["thumbnail_url"] if (
-                isinstance(row["thumbnail_url"], str) and row["thumbnail_url"].startswith("http")
-            ) else "https://picsum.photos/300/200"
-
-            # Gambar
-            st.image(thumb, use_container_width=True)
-
-            # Nama
-            st.markdown(f"**{row['name'][:40]}**")
-            bed = int(row.get("bedrooms", 0))
-            bath = int(row.get("bathrooms", 0))
-            guest = int(row.get("beds", 0))
-            st.markdown(f"🛏️ {bed} Bedroom | 🛁 {bath} Bathroom")
-            st.markdown(f"👨‍👩‍👧 {guest} Guests")
-
-            # Rating dan jumlah review
-            rating = row.get("review_scores_rating", 0)
-            reviews = int(row.get("number_of_reviews", 0))
-            st.markdown(f"⭐ **{rating:.1f}** ({reviews})")
-
-            # Harga lama (dicoret)
-            was_price = row.get("was_price", 0)
-            st.markdown(
-                f"<span style='color:gray;text-decoration:line-through;'>Was: ${was_price:.2f}</span>",
-                unsafe_allow_html=True
-            )
-
-            # Harga baru (teks tebal & warna oranye)
-            now_price = row.get("log_price", 0)
-            st.markdown(
-                f"<span style='font-weight:700;color:orange;'>Now: ${now_price:.2f}</span>",
-                unsafe_allow_html=True
-            )
+    render_paged_grid(
+        "top_stays", filtered_df,
+        filter_spec_key(grid="top_stays", property_type=selected_property, **filter_spec),
+        order=row_indexes["rank_order"],
+    )
 
 st.markdown("---")
 
 # -------------------- Display Grid --------------------
 st.markdown(f"### ✨ Most Popular Stays **{user_country}**")
 
-# Ambil top 5 overall (tanpa filter property_type)
-popular_df = (
-    usa_df.sort_values(
-        ["review_scores_rating", "number_of_reviews"],
-        ascending=[False, False]
-    )
-    .head(5)
+# Ranking overall (tanpa filter property_type)
+render_paged_grid(
+    "popular", usa_df, filter_spec_key(grid="popular", **filter_spec), order=row_indexes["rank_order"],
 )
 
-cols = st.columns(5, gap="medium")
-
-for idx, (_, row) in enumerate(popular_df.iterrows()):
-    with cols[idx % 5]:
-        thumb = row["thumbnail_url"] if (
-            isinstance(row["thumbnail_url"], str) and row["thumbnail_url"].startswith("http")
-        ) else "https://picsum.photos/300/200"
-
-        st.image(thumb, use_container_width=True)
-        st.markdown(f"**{row['name'][:40]}**")
-        bed = int(row.get("bedrooms", 0))
-        bath = int(row.get("bathrooms", 0))
-        guest = int(row.get("beds", 0))
-        st.markdown(f"🛏️ {bed} Bedroom | 🛁 {bath} Bathroom")
-        st.markdown(f"👨‍👩‍👧 {guest} Guests")
-
-        rating = row.get("review_scores_rating", 0)
-        reviews = int(row.get("number_of_reviews", 0))
-        st.markdown(f"⭐ **{rating:.1f}** ({reviews})")
-
-        was_price = row.get("was_price", 0)
-        st.markdown(
-            f"<span style='color:gray;text-decoration:line-through;'>Was: ${was_price:.2f}</span>",
-            unsafe_allow_html=True
-        )
-
-        now_price = row.get("log_price", 0)
-        st.markdown(
-            f"<span style='font-weight:700;color:orange;'>Now: ${now_price:.2f}</span>",
-            unsafe_allow_html=True
-        )
-
 st.markdown("---")
 # -------------------- Top Activities --------------------
 st.header(f"🎯 Top Activities for **{user_country}** Traveler’s Picks")
 st.write("Explore our best-in-class destinations, loved and recommended by our guests across the United States!")
 
-# -------------------- Filter Country --------------------
-if "country" in df.columns:
-    usa_mask = df["country"].str.contains("USA|United States|America", case=False, na=False)
-    usa_df = df[usa_mask].copy() if usa_mask.sum() > 0 else df.copy()
-else:
-    usa_df = df.copy()
-
-# Pastikan kolom utama tersedia
-required_cols = ["specification", "review_scores_rating", "number_of_reviews", "thumbnail_url", "name"]
-for col in required_cols:
-    if col not in usa_df.columns:
-        usa_df[col] = None
-
 # -------------------- Activity Dropdown Filter --------------------
-activity_options = [
-    "Near Airport", "Near Art Alley", "Near Art Gallery", "Near Art Lane", "Near Art Market", "Near Art Street",
-    "Near Artisan Market", "Near Beach", "Near Beach Walk", "Near Beachfront", "Near Botanical Garden",
-    "Near Boutique Street", "Near Business District", "Near Business Hub", "Near Camping Spot", "Near Central Park",
-    "Near City Center", "Near City Market", "Near City Museum", "Near Cliff Trail", "Near Cliff View",
-    "Near Cliff Viewpoint", "Near Coastal Boardwalk", "Near Coffee Quarter", "Near Concert Arena",
-    "Near Convention Hall", "Near Creative District", "Near Creative Hub", "Near Cultural Market",
-    "Near Cultural Village", "Near Downtown", "Near Downtown Street", "Near Food Street", "Near Forest Edge",
-    "Near Forest Reserve", "Near Forest Retreat", "Near Forest Trail", "Near Golf Course", "Near Golf Park",
-    "Near Harbor View", "Near Harbor Walk", "Near Harborfront", "Near Heritage District", "Near Heritage Town",
-    "Near Hiking Trail", "Near Hilltop Café", "Near Historical Museum", "Near Lake Garden", "Near Lake Trail",
-    "Near Lakefront", "Near Lakeside Pavilion", "Near Lookout Point", "Near Marina Bay", "Near Marina Pier",
-    "Near Market", "Near Mountain Peak", "Near Mountain Trail", "Near Mountain Valley", "Near Mountain View",
-    "Near National Park", "Near Nature Reserve", "Near Night Bazaar", "Near Night Street", "Near Nightlife Area",
-    "Near Ocean Breeze Point", "Near Ocean Point", "Near Ocean Viewpoint", "Near Oceanfront", "Near Old Town",
-    "Near Open Air Café", "Near Park District", "Near Pedestrian Bridge", "Near Picnic Ground", "Near Rice Terrace",
-    "Near River View", "Near Riverbank", "Near Riverbank Trail", "Near Riverbank Walk", "Near Riverside Café",
-    "Near Riverside Garden", "Near Riverside Lodge", "Near Riverside Walk", "Near Riverwalk", "Near Rooftop Bar",
-    "Near Scenic Park", "Near Seafood Market", "Near Shopping Avenue", "Near Shopping District", "Near Shopping Mall",
-    "Near Shopping Promenade", "Near Shopping Street", "Near Surf Spot", "Near Sunset Bar", "Near Sunset Point",
-    "Near Sunset View", "Near Stadium", "Near Temple", "Near Temple Courtyard", "Near Train Station", "Near Urban Park",
-    "Near Valley View", "Near Village Café", "Near Village View", "Near Village Walk", "Near Waterfall View"
-]
+# Opsi + konsep diambil dari data (attractions.py), dibangun ulang kalau data source berubah
+if from_startup:
+    attraction_index = startup.result("attractions")
+else:
+    attraction_index = get_attraction_index(data_source, df)
+track_frames("indexes", once=True, **{f"attractions@{data_source}": attraction_index.bits})
 
 # Dropdown multiselect
 selected_activities = st.multiselect(
     "🏖️ Choose Nearby Attractions",
-    options=sorted(activity_options),
-    placeholder="Select one or more nearby areas..."
+    options=attraction_index.phrases,
+    placeholder="Select one or more nearby areas...",
+    key="filter_attractions", on_change=_log_widget, args=("attractions", None, "filter_attractions"),
 )
 
 # -------------------- Filter berdasarkan dropdown --------------------
+# Tiap pilihan diperluas ke atraksi terkait (konsep yang sama, mis. Beach -> Oceanfront, Ocean Point);
+# semua pilihan harus terpenuhi (AND) — operasi bitmap, tanpa scan string specification
 if selected_activities:
-    spec_filled = usa_df["specification"].fillna("").str.lower()
-
-    if len(selected_activities) == 1:
-        # 1 pilihan → sistem seperti LIKE '%Near Art Gallery%'
-        keyword = selected_activities[0].lower()
-        filtered = usa_df[spec_filled.str.contains(keyword)]
-    else:
-        # Lebih dari 1 pilihan → semua keyword harus muncul (AND)
-        filtered = usa_df[
-            spec_filled.apply(
-                lambda x: all(k.lower() in x for k in selected_activities)
-            )
-        ].copy()
+    related = [p for phrase in selected_activities for p in attraction_index.related(phrase)[1:]]
+    if related:
+        st.caption("Also matching related attractions: " + ", ".join(dict.fromkeys(related)))
+    filtered = df[country_mask & attraction_index.mask(selected_activities)]
 else:
-    filtered = usa_df.copy()
+    filtered = df[country_mask]
+
+# Pastikan kolom utama tersedia
+required_cols = ["specification", "review_scores_rating", "number_of_reviews", "thumbnail_url", "name"]
+missing_cols = [col for col in required_cols if col not in filtered.columns]
+if missing_cols:
+    filtered = filtered.assign(**{col: None for col in missing_cols})
+track_frames("activities", filtered=filtered)
 
 # -------------------- Sort & Display --------------------
 if filtered.empty:
     st.warning("No listings found for the selected activity area(s).")
 else:
-    filtered = filtered.sort_values(
-        ["review_scores_rating", "number_of_reviews"],
-        ascending=[False, False]
-    ).head(5)
-
     title_text = ", ".join(selected_activities) if selected_activities else "Top Activities Overall"
     st.markdown(f"### 🏖️ Traveler’s Picks: **{title_text}**")
 
-    cols = st.columns(5, gap="medium")
-    for idx, (_, row) in enumerate(filtered.iterrows()):
-        with cols[idx % 5]:
-            thumb = row["thumbnail_url"] if (
-                isinstance(row["thumbnail_url"], str) and row["thumbnail_url"].startswith("http")
-            ) else "https://picsum.photos/300/200"
-
-            st.image(thumb, use_container_width=True)
-            st.markdown(f"**{row['name'][:40]}**")
-            bed = int(row.get("bedrooms", 0))
-            bath = int(row.get("bathrooms", 0))
-            guest = int(row.get("beds", 0))
-            st.markdown(f"🛏️ {bed} Bedroom | 🛁 {bath} Bathroom")
-            st.markdown(f"👨‍👩‍👧 {guest} Guests")
-
-            rating = row.get("review_scores_rating", 0)
-            reviews = int(row.get("number_of_reviews", 0))
-            st.markdown(f"⭐ **{rating:.1f}** ({reviews})")
-
-            spec_text = row.get("specification", "")
-            st.markdown(f"<span style='color:gray;font-size:13px;'>{spec_text}</span>", unsafe_allow_html=True)
+    render_paged_grid(
+        "activities", filtered,
+        filter_spec_key(grid="activities", dataset=data_source, activities=sorted(selected_activities)),
+        show_prices=False, show_spec=True, order=row_indexes["rank_order"],
+    )
 
 st.markdown("---")
 
@@ -806,90 +1160,63 @@ required_cols = [
     "property_type", "latitude", "longitude", "name", "specification",
     "log_price", "was_price", "thumbnail_url"
 ]
-for col in required_cols:
-    if col not in df.columns:
-        df[col] = None
-
-# Filter sesuai property_type jika ada
+missing_cols = [col for col in required_cols if col not in df.columns]
+if missing_cols:
+    # assign() membuat frame baru; df bisa jadi milik bersama (cache/partisi)
+    df = df.assign(**{col: None for col in missing_cols})
+
+# Posisi baris urut latitude, longitude (geo_order) atas seluruh dataset, difilter sesuai property_type jika ada.
+# Catatan: mode partisi hanya memuat partisi GRID_COUNTRY, jadi di sana deal hanya dari negara itu
+# (partisi lain tidak dimuat hanya untuk Special Deals).
+geo_order = np.asarray(row_indexes["geo_order"])
 if selected_type:
-    subset = df[df["property_type"].str.lower() == selected_type.lower()].copy()
-else:
-    subset = df.copy()
-
-# Cari pasangan properti yang berdekatan
-if not subset.empty and len(subset) > 1:
-    subset = subset.sort_values(by=["latitude", "longitude"], ascending=True).reset_index(drop=True)
-    bundles = [(subset.iloc[i], subset.iloc[i + 1]) for i in range(0, len(subset) - 1, 2)]
+    type_mask = (df["property_type"].str.lower() == selected_type.lower()).to_numpy(dtype=bool, na_value=False)
+    geo_order = geo_order[type_mask[geo_order]]
+
+# Pasangan properti yang berdekatan = posisi (2k, 2k+1) di geo_order.
+# Pilih 3 pasangan random agar setiap refresh berbeda; hanya 6 baris itu yang diambil dari df.
+n_pairs = len(geo_order) // 2
+if n_pairs >= 3:
+    picks = random.sample(range(n_pairs), k=3)
+    pair_rows = df.iloc[geo_order[[2 * p + o for p in picks for o in (0, 1)]]]
 else:
-    bundles = []
-
-# Kalau data kurang dari 3 bundle, ambil random fallback
-if len(bundles) < 3:
-    random_df = df.sample(min(6, len(df)), random_state=np.random.randint(0, 9999)).reset_index(drop=True)
-    bundles = [(random_df.iloc[i], random_df.iloc[i + 1]) for i in range(0, len(random_df) - 1, 2)]
-
-# Pilih 3 bundle random agar setiap refresh berbeda
-import random
-if bundles:
-    bundles = random.sample(bundles, k=min(3, len(bundles)))
+    # Kalau data kurang dari 3 bundle, ambil random fallback (jumlah baris dibulatkan ke pasangan penuh)
+    pair_rows = df.sample(min(6, len(df)), random_state=np.random.randint(0, 9999))
+    pair_rows = pair_rows.iloc[: len(pair_rows) // 2 * 2]
+track_frames("special_deals", geo_order=geo_order)
 
 # -------------------- Display Bundles --------------------
+# Pasangan dipilih ulang secara acak setiap rerun, jadi setiap rerun memang menampilkan kartu baru
+if "id" in pair_rows.columns:
+    log_impressions("special_deals", pair_rows["id"].tolist())
 cols = st.columns(3)
-for i, (prop1, prop2) in enumerate(bundles):
+for i, bundle in enumerate(bundle_cards(pair_rows)):
     with cols[i % 3]:
-        img_url = (
-            prop1["thumbnail_url"]
-            if isinstance(prop1["thumbnail_url"], str) and prop1["thumbnail_url"].startswith("http")
-            else "https://picsum.photos/400/250"
-        )
-        st.image(img_url, use_container_width=True)
-
-        st.markdown(f"**{prop1['name']}**")
-        st.markdown(f"<span style='color:gray;font-size:13px;'>{prop1['specification']}</span>", unsafe_allow_html=True)
-
-        st.markdown(f"**{prop2['name']}**")
-        st.markdown(f"<span style='color:gray;font-size:13px;'>{prop2['specification']}</span>", unsafe_allow_html=True)
-
-        def safe_float(x):
-            try:
-                return float(x)
-            except (TypeError, ValueError):
-                return 0.0
-
-        was_1, was_2 = safe_float(prop1["was_price"]), safe_float(prop2["was_price"])
-        total_was = was_1 + was_2
-
-        price_1, price_2 = safe_float(prop1["log_price"]), safe_float(prop2["log_price"])
-        total_price = price_1 + price_2
+        st.image(bundle["thumb"] or "https://picsum.photos/400/250", use_container_width=True)
 
+        for name, spec in bundle["listings"]:
+            st.markdown(f"**{name}**")
+            st.markdown(f"<span style='color:gray;font-size:13px;'>{spec}</span>", unsafe_allow_html=True)
 
         st.markdown(
-            f"<span style='text-decoration:line-through;color:gray;'>"
-            f"$ {was_1:,.0f} + $ {was_2:,.0f} = $ {total_was:,.0f}"
-            f"</span>",
+            f"<span style='text-decoration:line-through;color:gray;'>{bundle['was']}</span>",
             unsafe_allow_html=True
         )
 
         st.markdown(
-            f"<span style='font-weight:800;color:orange;'>"
-            f"Now: $ {total_price:,.0f}"
-            f"</span>",
+            f"<span style='font-weight:800;color:orange;'>Now: {bundle['now']}</span>",
             unsafe_allow_html=True
         )
 
-        discount_pct = 0
-        if total_was > 0:
-            discount_pct = (1 - total_price / total_was) * 100
         st.markdown(
-            f"<span style='color:#16a34a;font-weight:700;'>💰 Save {discount_pct:.1f}%</span>",
+            f"<span style='color:#16a34a;font-weight:700;'>💰 Save {bundle['save']}</span>",
             unsafe_allow_html=True
         )
 
 st.markdown("---")
 # -------------------- Travel Tips Banner Image --------------------
-image4_path = "images/image4.png"
-if os.path.exists(image4_path):
-    b64_image = img_file_to_base64(image4_path)
+b64_image = startup_result("banner")
+if b64_image:
     HERO_HEIGHT_PX = 600  # sama seperti hero slider
     st.markdown(
         f"""
@@ -937,3 +1264,5 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+track_session()
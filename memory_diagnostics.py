@@ -0,0 +1,156 @@
+# memory_diagnostics.py — opt-in memory profiling for the app (tracemalloc, frame sizes, session state)
+"""
+Enabled with STAY_MEMORY_DIAGNOSTICS=1. One MemoryDiagnostics per process
+(main.py keeps it in st.cache_resource) collects:
+
+- tracemalloc: a baseline snapshot when diagnostics start; reports list the
+  top allocation sites by current size and by growth since the baseline;
+- DataFrame memory_usage(deep=True) per app section (dataset, filters,
+  top stays, activities, special deals), sampled every `sample_every` reruns;
+- per-session st.session_state size (deep), sampled the same way.
+
+The report is shown on the admin page (main.py?admin=memory) and written as
+JSON to STAY_MEMORY_DUMP (on demand and at process exit), which loadtest.py
+reads to put per-session memory in the benchmark report.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_SESSIONS = 1000  # sesi terakhir yang dilacak (LRU), supaya diagnostik sendiri tidak tumbuh tanpa batas
+
+
+def deep_sizeof(obj, _seen=None):
+    """Approximate deep size in bytes (DataFrame/Series deep memory_usage, ndarray nbytes, containers recursively)."""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True, index=True))
+    if isinstance(obj, np.ndarray):
+        # view tidak memiliki buffer-nya sendiri
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def _site(stat):
+    frame = stat.traceback[0]
+    return {
+        "site": f"{os.path.relpath(frame.filename) if not frame.filename.startswith('<') else frame.filename}:{frame.lineno}",
+        "kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+
+
+class MemoryDiagnostics:
+    def __init__(self, dump_path=None, sample_every=10, top_n=15, nframes=1):
+        self.dump_path = dump_path
+        self.sample_every = max(1, sample_every)
+        self.top_n = top_n
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._reruns = 0
+        self._frames = {}  # (section, name) -> {"kb", "rows", "max_kb"}
+        self._sessions = OrderedDict()  # session id -> bytes (sampel terakhir)
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+        self._baseline = tracemalloc.take_snapshot()
+        if dump_path:
+            atexit.register(self.dump)
+
+    # -------------------- Dipanggil dari main.py --------------------
+    def tick(self):
+        """
+        Call once per rerun; returns True when this rerun should be sampled
+        (record_frames / record_session are only worth their cost on those).
+        """
+        with self._lock:
+            self._reruns += 1
+            return (self._reruns - 1) % self.sample_every == 0
+
+    def record_frames(self, section, once=False, **frames):
+        """
+        Deep memory_usage of the given DataFrames / arrays for `section`.
+        once=True measures each name only the first time — for
+        shared cached objects whose deep scan is expensive and does not change.
+        """
+        for name, frame in frames.items():
+            if frame is None or (once and (section, name) in self._frames):
+                continue
+            kb = deep_sizeof(frame) / 1024
+            with self._lock:
+                prev = self._frames.get((section, name), {}).get("max_kb", 0.0)
+                self._frames[(section, name)] = {"kb": round(kb, 1), "rows": len(frame), "max_kb": round(max(prev, kb), 1)}
+
+    def record_session(self, session_id, state):
+        """Deep size of one session's state (a dict copy of st.session_state)."""
+        size = deep_sizeof(state)
+        with self._lock:
+            self._sessions[session_id] = size
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+
+    # -------------------- Report --------------------
+    def report(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            frames = [
+                {"section": section, "frame": name, **info} for (section, name), info in sorted(self._frames.items())
+            ]
+            reruns = self._reruns
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started, 1),
+            "reruns": reruns,
+            "sample_every": self.sample_every,
+            "traced_current_mb": round(current / 2**20, 2),
+            "traced_peak_mb": round(peak / 2**20, 2),
+            "frames": frames,
+            "sessions": {
+                "tracked": len(sessions),
+                "total_kb": round(sum(sessions) / 1024, 1),
+                "mean_kb": round(float(np.mean(sessions)) / 1024, 1) if sessions else 0.0,
+                "max_kb": round(max(sessions) / 1024, 1) if sessions else 0.0,
+            },
+            "top_sites": [_site(s) for s in snapshot.statistics("lineno")[: self.top_n]],
+            "top_growth": [
+                {**_site(s), "kb": round(s.size_diff / 1024, 1), "count": s.count_diff}
+                for s in snapshot.compare_to(self._baseline, "lineno")[: self.top_n]
+            ],
+        }
+
+    def dump(self, path=None):
+        """Write the report as JSON (atomically) and return the path, or None when no path is configured."""
+        path = path or self.dump_path
+        if not path:
+            return None
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
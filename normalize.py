@@ -0,0 +1,191 @@
+# normalize.py — one-time column normalization at ingestion (not per card / per rerun)
+"""
+normalize_listings() runs once in the load path (dataset_store.read_listings_csv)
+and, in bulk:
+
+- validates rows and moves the unusable ones to a rejected-row report;
+- coerces every filter/sort column to its dtype and fills the gaps (unknown
+  room counts stay NaN, so they never become a dropdown option);
+- precomputes the display_* text fields the cards print, so the render path
+  only reads strings (no int()/float()/format per row).
+
+    python normalize.py --csv dataset/Airbnb_Cleaned.csv --rejected rejected.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ["log_price", "was_price"]
+DATE_COLUMNS = ["first_review", "host_since", "last_review", "available_date"]
+
+# Kolom hitungan: kosong / tidak valid -> 0 (tetap float64 supaya bisa dibaca zero-copy dari Arrow)
+COUNT_COLUMNS = ["number_of_reviews"]
+# Jumlah kamar / tamu: kosong tetap NaN (= tidak diketahui, bukan 0), supaya opsi dropdown hanya
+# dari nilai yang terisi; filter membaca kosong sebagai 0 seperti baseline
+ROOM_COLUMNS = ["bedrooms", "bathrooms", "beds"]
+# Kolom angka yang boleh kosong (NaN): rating kosong diurutkan paling akhir, koordinat kosong di akhir geo_order
+OPTIONAL_NUMERIC_COLUMNS = ["review_scores_rating", "latitude", "longitude"]
+TEXT_COLUMNS = ["name", "specification", "thumbnail_url", "country", "property_type"]
+
+MISSING_TEXT = "–"
+CARD_NAME_LENGTH = 40
+
+# Field siap tampil yang dibaca render_stay_card / Special Deals
+# (specification dibaca langsung: sudah string bersih, kolom teks terbesar tidak disalin)
+DISPLAY_COLUMNS = [
+    "display_name", "display_thumb", "specification", "display_bedrooms", "display_bathrooms",
+    "display_beds", "display_rating", "display_reviews", "display_price", "display_was_price",
+]
+
+
+def normalize_prices(df):
+    """
+    Coerce price columns to float64 (invalid -> NaN) and add `discount_pct`
+    (0 when there is no usable was_price). Works in place on a freshly loaded
+    frame and returns it.
+    """
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        else:
+            df[col] = np.nan
+
+    price = df["log_price"].to_numpy()
+    was = df["was_price"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discount = np.where(was > 0, (1.0 - price / was) * 100.0, 0.0)
+    df["discount_pct"] = np.nan_to_num(discount, nan=0.0)
+    return df
+
+
+def _coerce_numeric(df, col, coerced):
+    """float64 column (invalid -> NaN); counts non-empty raw values that failed to parse."""
+    if col not in df.columns:
+        df[col] = np.nan
+        return
+    raw = df[col]
+    values = pd.to_numeric(raw, errors="coerce").astype("float64")
+    bad = int((values.isna() & raw.notna()).sum())
+    if bad:
+        coerced[col] = bad
+    df[col] = values
+
+
+def _format_number(values, fmt, missing=MISSING_TEXT):
+    """Vectorized number -> text (one pass over the column, NaN -> `missing`)."""
+    text = pd.Series(values).map(fmt.format, na_action="ignore")
+    return text.fillna(missing).to_numpy(dtype=object)
+
+
+def _coerce_ids(df, coerced):
+    """
+    Listing ids as numbers (int64 after _reject); missing, non-numeric or fractional ids -> NaN.
+    The offline tools and the event log key on `id`, so a bad id rejects the row instead of
+    turning into a garbage int64 later.
+    """
+    raw = df["id"]
+    ids = pd.to_numeric(raw, errors="coerce")
+    if not pd.api.types.is_integer_dtype(ids):
+        ids = ids.where(ids % 1 == 0)
+        bad = int((ids.isna() & raw.notna()).sum())
+        if bad:
+            coerced["id"] = bad
+    df["id"] = ids
+
+
+def _reject(df):
+    """Reason per row (None = keep). Rows without a name, a usable price or a valid id (when the column exists) are dropped."""
+    reasons = pd.Series(None, index=df.index, dtype=object)
+    price = df["log_price"]
+    reasons[price.isna()] = "missing or invalid log_price"
+    reasons[price < 0] = "negative log_price"
+    reasons[df["name"].str.strip().eq("")] = "missing name"
+    if "id" in df.columns:
+        reasons[df["id"].isna()] = "missing or invalid id"
+    return reasons
+
+
+def normalize_listings(df):
+    """
+    Validate, coerce and fill the listing columns once, in bulk, and add the
+    display_* fields. Works in place on a freshly loaded frame.
+
+    Returns (df, report) where `df` only keeps valid rows (index reset) and
+    `report` is a dict: rows_in, rows_out, coerced (col -> values that failed to
+    parse), filled (col -> empty values filled) and rejected (DataFrame of the
+    dropped rows with a `reject_reason` column).
+    """
+    rows_in = len(df)
+    coerced, filled = {}, {}
+
+    normalize_prices(df)
+    for col in COUNT_COLUMNS:
+        _coerce_numeric(df, col, coerced)
+        holes = int(df[col].isna().sum())
+        if holes:
+            filled[col] = holes
+            df[col] = df[col].fillna(0.0)
+    for col in ROOM_COLUMNS + OPTIONAL_NUMERIC_COLUMNS:
+        _coerce_numeric(df, col, coerced)
+    if "id" in df.columns:
+        _coerce_ids(df, coerced)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in TEXT_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.Series(None, index=df.index, dtype=object)
+    df["name"] = df["name"].fillna("").astype(str)
+    df["specification"] = df["specification"].fillna("").astype(str)
+
+    reasons = _reject(df)
+    bad = reasons.notna().to_numpy()
+    rejected = df[bad].assign(reject_reason=reasons[bad])
+    if bad.any():
+        df = df[~bad].reset_index(drop=True)
+    if "id" in df.columns:
+        df["id"] = df["id"].astype(np.int64)
+
+    # -------------------- Display fields (dihitung sekali, bukan per kartu) --------------------
+    thumb = df["thumbnail_url"].astype("string")
+    df["display_name"] = df["name"].str.slice(0, CARD_NAME_LENGTH)
+    df["display_thumb"] = thumb.where(thumb.str.startswith("http").fillna(False), "").astype(str)
+    for col in ROOM_COLUMNS:
+        df[f"display_{col}"] = df[col].fillna(0.0).astype(np.int64).astype(str)
+    df["display_reviews"] = df["number_of_reviews"].astype(np.int64).astype(str)
+    df["display_rating"] = _format_number(df["review_scores_rating"].to_numpy(), "{:.1f}")
+    df["display_price"] = _format_number(df["log_price"].to_numpy(), "${:.2f}")
+    df["display_was_price"] = _format_number(df["was_price"].to_numpy(), "${:.2f}")
+
+    report = {
+        "rows_in": rows_in,
+        "rows_out": len(df),
+        "coerced": coerced,
+        "filled": filled,
+        "rejected": rejected,
+    }
+    return df, report
+
+
+def int_options(series, default=(1, 2, 3)):
+    """Sorted distinct integer values of a normalized room column, empty values excluded (for the filter dropdowns)."""
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    values = np.unique(values[~np.isnan(values)].astype(np.int64))
+    return values.tolist() or list(default)
+
+
+if __name__ == "__main__":
+    from dataset_store import read_listings_csv
+
+    parser = argparse.ArgumentParser(description="Normalize the listings CSV and report rejected rows.")
+    parser.add_argument("--csv", default="dataset/Airbnb_Cleaned.csv")
+    parser.add_argument("--rejected", default=None, help="write the rejected rows (with reasons) to this CSV")
+    args = parser.parse_args()
+
+    _, report = read_listings_csv(args.csv, with_report=True)
+    rejected = report.pop("rejected")
+    print(report)
+    print(rejected["reject_reason"].value_counts().to_string() if len(rejected) else "no rejected rows")
+    if args.rejected:
+        rejected.to_csv(args.rejected)
@@ -0,0 +1,56 @@
+# pagination.py — cursor-based paging over ranked result ids
+"""
+A cursor is a short string "<spec_key>:<offset>". It is bound to the filter spec
+it was created for, so a cursor from an old filter silently restarts at page 1
+instead of pointing into a different result list.
+
+Only the cursor lives in st.session_state; the ranked ids are shared (cached once
+per filter spec), so per-session memory does not grow with how far a user scrolls.
+"""
+
+PAGE_SIZE = 5
+
+
+def encode_cursor(spec_key, offset):
+    return f"{spec_key}:{int(offset)}"
+
+
+def decode_cursor(cursor, spec_key):
+    """Offset stored in `cursor`, or 0 if it is missing, malformed or for another spec."""
+    if not cursor:
+        return 0
+    key, _, offset = str(cursor).rpartition(":")
+    if key != spec_key or not offset.isdigit():
+        return 0
+    return int(offset)
+
+
+def next_page(ranked_ids, cursor, spec_key, page_size=PAGE_SIZE):
+    """
+    Return (ids, next_cursor) for the page starting at `cursor`.
+    `next_cursor` is None on the last page. Cost is O(page_size): a slice view, no copy.
+    """
+    start = min(decode_cursor(cursor, spec_key), len(ranked_ids))
+    end = min(start + page_size, len(ranked_ids))
+    ids = ranked_ids[start:end]
+    return ids, (encode_cursor(spec_key, end) if end < len(ranked_ids) else None)
+
+
+def loaded_ids(ranked_ids, cursor, spec_key, page_size=PAGE_SIZE):
+    """
+    All ids loaded so far for an infinite-scroll grid (first page when there is no cursor).
+    `cursor` marks the end of the loaded range.
+    """
+    end = max(decode_cursor(cursor, spec_key), page_size)
+    return ranked_ids[: min(end, len(ranked_ids))]
+
+
+def has_more(ranked_ids, cursor, spec_key, page_size=PAGE_SIZE):
+    return max(decode_cursor(cursor, spec_key), page_size) < len(ranked_ids)
+
+
+def advance_cursor(ranked_ids, cursor, spec_key, page_size=PAGE_SIZE):
+    """Cursor after loading one more page onto what `cursor` already covers."""
+    start = max(decode_cursor(cursor, spec_key), page_size)
+    ids, _ = next_page(ranked_ids, encode_cursor(spec_key, start), spec_key, page_size)
+    return encode_cursor(spec_key, start + len(ids))
@@ -0,0 +1,205 @@
+# partition_store.py — listings partitioned by country, loaded lazily with an LRU memory cap
+"""
+Layout on disk (written by write_partitioned_dataset):
+
+    <root>/catalog.json
+    <root>/country=<key>.arrow      one Arrow IPC file per normalized country
+
+A PartitionStore only reads catalog.json up front. A partition is loaded the
+first time a session asks for its country, and least-recently-used partitions
+are evicted when the loaded total goes over `max_bytes`. Memory therefore
+follows the countries that are actually being served, not the global inventory.
+The flip side: a section that would span countries (Special Deals in main.py)
+only sees the partitions that are loaded. Rebuild the partitions after the CSV
+changes; main.py ignores a catalog older than the CSV (catalog_is_stale).
+
+    python partition_store.py --csv dataset/Airbnb_Cleaned.csv --out dataset/partitions
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from dataset_store import open_arrow_dataset, read_listings_csv, write_arrow_dataset
+from normalize import DISPLAY_COLUMNS
+from ranking import COUNTRY_PATTERNS
+
+CATALOG_FILE = "catalog.json"
+UNKNOWN_COUNTRY = "unknown"
+ALL_PARTITIONS = "*"  # kunci cache untuk load_all()
+
+
+def normalize_country(name):
+    """Partition key for a raw country value ("United States" -> "usa", "Indonesia" -> "indonesia")."""
+    if name is None or pd.isna(name) or not str(name).strip():
+        return UNKNOWN_COUNTRY
+    text = str(name).strip()
+    for canonical, pattern in COUNTRY_PATTERNS.items():
+        if re.search(pattern, text, flags=re.IGNORECASE):
+            return canonical.lower()
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or UNKNOWN_COUNTRY
+
+
+def write_partitioned_dataset(df, root):
+    """Split `df` by normalized country into Arrow files under `root` and write the catalog."""
+    os.makedirs(root, exist_ok=True)
+    keys = df["country"].map(normalize_country) if "country" in df.columns else pd.Series(UNKNOWN_COUNTRY, index=df.index)
+
+    partitions = {}
+    for key, part in df.groupby(keys, sort=True):
+        filename = f"country={key}.arrow"
+        path = write_arrow_dataset(part.reset_index(drop=True), os.path.join(root, filename))
+        names = part["country"].dropna().astype(str).value_counts() if "country" in part.columns else pd.Series(dtype=int)
+        partitions[key] = {
+            "file": filename,
+            "rows": int(len(part)),
+            "bytes": os.path.getsize(path),
+            # nama tampilan = ejaan yang paling sering dipakai di data
+            "label": names.index[0] if len(names) else key,
+            "names": sorted(names.index.tolist()),
+        }
+
+    catalog = {"version": int(time.time()), "columns": list(df.columns), "partitions": partitions}
+    tmp_path = os.path.join(root, f"{CATALOG_FILE}.tmp-{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp_path, os.path.join(root, CATALOG_FILE))
+    return catalog
+
+
+def has_catalog(root):
+    return os.path.exists(os.path.join(root, CATALOG_FILE))
+
+
+def catalog_is_stale(root, csv_path):
+    """
+    Reason the catalog under `root` can't be served for `csv_path` (None = current):
+    older than the CSV (same rule as dataset_store.build_arrow_dataset), or written
+    before the display_* columns the cards read existed.
+    """
+    catalog_path = os.path.join(root, CATALOG_FILE)
+    if os.path.exists(csv_path) and os.path.getmtime(catalog_path) < os.path.getmtime(csv_path):
+        return f"{catalog_path} is older than {csv_path}"
+    with open(catalog_path) as f:
+        columns = set(json.load(f).get("columns", []))
+    missing = [col for col in DISPLAY_COLUMNS if col not in columns]
+    if missing:
+        return f"{catalog_path} has no {', '.join(missing)} (built by an older version)"
+    return None
+
+
+class PartitionStore:
+    """
+    Thread-safe lazy loader for a partitioned dataset. Frames handed out are
+    shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        with open(os.path.join(root, CATALOG_FILE)) as f:
+            self.catalog = json.load(f)
+        self._loaded = OrderedDict()  # key -> (DataFrame, bytes)
+        self._lock = threading.Lock()  # hanya untuk cek / sisip / evict di LRU
+        self._key_locks = {}  # key -> Lock, satu pembacaan disk per partisi sekaligus
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def version(self):
+        return self.catalog.get("version", 0)
+
+    def countries(self):
+        """Display names for the login dropdown (one per partition, unknown excluded)."""
+        parts = self.catalog["partitions"]
+        return sorted(p["label"] for key, p in parts.items() if key != UNKNOWN_COUNTRY)
+
+    def key_for(self, country):
+        return normalize_country(country)
+
+    def has_partition(self, country):
+        return self.key_for(country) in self.catalog["partitions"]
+
+    def load(self, country):
+        """DataFrame for `country` (empty frame with the catalog columns if it has no partition)."""
+        key = self.key_for(country)
+        info = self.catalog["partitions"].get(key)
+        if info is None:
+            return pd.DataFrame(columns=self.catalog.get("columns", []))
+        return self._cached(key, lambda: open_arrow_dataset(os.path.join(self.root, info["file"])).to_pandas())
+
+    def load_all(self):
+        """
+        Every partition as one frame (the whole dataset), cached under ALL_PARTITIONS like a
+        partition. Fallback for callers whose country has no partition.
+        """
+        def read():
+            frames = [
+                open_arrow_dataset(os.path.join(self.root, info["file"])).to_pandas()
+                for info in self.catalog["partitions"].values()
+            ]
+            if not frames:
+                return pd.DataFrame(columns=self.catalog.get("columns", []))
+            return pd.concat(frames, ignore_index=True)
+        return self._cached(ALL_PARTITIONS, read)
+
+    def _cached(self, key, read):
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Baca disk + to_pandas di luar lock global: load partisi lain / yang sudah di memori tidak ikut menunggu.
+        # Lock per key: sesi yang minta partisi yang sama menunggu satu pembacaan saja.
+        with key_lock:
+            with self._lock:
+                if key in self._loaded:
+                    self._loaded.move_to_end(key)
+                    return self._loaded[key][0]
+            frame = read()
+            size = int(frame.memory_usage(deep=True).sum())
+            with self._lock:
+                self._loaded[key] = (frame, size)
+                self.loads += 1
+                self._evict(keep=key)
+            return frame
+
+    def _evict(self, keep):
+        if self.max_bytes is None:
+            return
+        while self.loaded_bytes() > self.max_bytes and len(self._loaded) > 1:
+            oldest = next(iter(self._loaded))
+            if oldest == keep:
+                self._loaded.move_to_end(oldest)
+                continue
+            del self._loaded[oldest]
+            self.evictions += 1
+
+    def loaded_bytes(self):
+        return sum(size for _, size in self._loaded.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": list(self._loaded.keys()),
+                "loaded_mb": round(self.loaded_bytes() / 2**20, 2),
+                "max_mb": None if self.max_bytes is None else round(self.max_bytes / 2**20, 2),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition the listings CSV by country for lazy loading.")
+    parser.add_argument("--csv", default="dataset/Airbnb_Cleaned.csv")
+    parser.add_argument("--out", default="dataset/partitions")
+    args = parser.parse_args()
+    catalog = write_partitioned_dataset(read_listings_csv(args.csv), args.out)
+    for key, info in catalog["partitions"].items():
+        print(f"{key:<20} {info['rows']:>8} rows  {info['bytes'] / 2**20:8.2f} MB")
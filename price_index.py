@@ -0,0 +1,71 @@
+# price_index.py — sorted price index and precomputed price histograms
+"""
+Built once per dataset (or country partition) and shared by all sessions:
+
+- a sorted price array + the row positions in that order, so a price range
+  resolves with two binary searches (O(log n)) plus the matching rows;
+- shared histogram bin edges and the bin of every priced row, so the slider's
+  histogram and result count for the current filter mask are one bincount /
+  one gather instead of re-binning prices on every rerun.
+"""
+import numpy as np
+
+
+class PriceIndex:
+    def __init__(self, frame, price_col="log_price", bins=24, positions=None):
+        """`positions` may be a precomputed price order (e.g. from shared_dataset) to skip the sort."""
+        n = len(frame)
+        prices = frame[price_col].to_numpy(dtype=float) if price_col in frame.columns else np.full(n, np.nan)
+        if positions is None:
+            valid = np.flatnonzero(~np.isnan(prices))
+            positions = valid[np.argsort(prices[valid], kind="stable")]
+            positions.setflags(write=False)
+
+        self.n_rows = n
+        self.bins = bins
+        self.positions = positions  # posisi baris, urut dari harga termurah
+        self.sorted_prices = prices[self.positions]
+        self.sorted_prices.setflags(write=False)
+
+        if len(self.sorted_prices):
+            self.min_price = float(self.sorted_prices[0])
+            self.max_price = float(self.sorted_prices[-1])
+        else:
+            self.min_price = self.max_price = 0.0
+        self.edges = np.histogram_bin_edges(self.sorted_prices, bins=bins, range=(self.min_price, self.max_price or 1.0))
+
+        # Indeks bin per harga terurut (sekali); histogram untuk mask apa pun = bincount
+        self.sorted_bins = np.clip(
+            np.searchsorted(self.edges, self.sorted_prices, side="right") - 1, 0, bins - 1
+        ).astype(np.int16)
+        self.sorted_bins.setflags(write=False)
+        self._histogram = np.bincount(self.sorted_bins, minlength=bins)
+
+    def _bounds(self, low, high):
+        i = np.searchsorted(self.sorted_prices, low, side="left")
+        j = np.searchsorted(self.sorted_prices, high, side="right")
+        return i, j
+
+    def range_positions(self, low, high):
+        """Row positions with low <= price <= high (sorted by price). O(log n) + output size."""
+        i, j = self._bounds(low, high)
+        return self.positions[i:j]
+
+    def range_mask(self, low, high):
+        """Boolean row mask for the price range, to AND with the other filter masks."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.range_positions(low, high)] = True
+        return mask
+
+    def count(self, low, high, mask=None):
+        """Number of listings in the price range, among the rows of `mask` (all listings if None)."""
+        i, j = self._bounds(low, high)
+        if mask is None:
+            return int(j - i)
+        return int(np.count_nonzero(mask[self.positions[i:j]]))
+
+    def histogram(self, mask=None):
+        """(counts, edges) over the rows of `mask` (all listings if None)."""
+        if mask is None:
+            return self._histogram, self.edges
+        return np.bincount(self.sorted_bins[mask[self.positions]], minlength=self.bins), self.edges
@@ -0,0 +1,80 @@
+# ranking.py — ranking logic shared by the app grids and offline tools
+import hashlib
+import json
+import re
+
+import numpy as np
+
+# Urutan default: rating tertinggi, lalu review terbanyak
+RANK_COLUMNS = ["review_scores_rating", "number_of_reviews"]
+
+# Nama negara di dataset tidak seragam, jadi beberapa negara dicocokkan dengan regex
+COUNTRY_PATTERNS = {
+    "USA": "USA|United States|America",
+}
+
+
+def country_pattern(country):
+    """Case-insensitive regex used to select listings of `country`."""
+    return COUNTRY_PATTERNS.get(country, re.escape(str(country)))
+
+
+def rank_order(rating, reviews):
+    """
+    Return positions that sort the arrays by rating desc, then reviews desc.
+    Missing values go last and ties keep their original order, so the result is
+    deterministic for the same input (unlike DataFrame.sort_values' quicksort).
+    """
+    rating = np.asarray(rating, dtype=float)
+    reviews = np.asarray(reviews, dtype=float)
+    rating_key = np.where(np.isnan(rating), np.inf, -rating)
+    reviews_key = np.where(np.isnan(reviews), np.inf, -reviews)
+    # lexsort: kunci terakhir = kunci utama
+    return np.lexsort((np.arange(len(rating)), reviews_key, rating_key))
+
+
+def rank_row_ids(frame, order=None):
+    """
+    Ranked index labels of `frame` (the ids the grids page through).
+    The returned array is read-only so it can be shared between sessions.
+
+    `order` is an optional precomputed rank_order of the base frame whose
+    RangeIndex labels `frame` carries (a filtered view); the ranking then only
+    filters that order instead of sorting again.
+    """
+    if len(frame) == 0:
+        ids = np.empty(0, dtype=np.int64)
+    elif order is not None:
+        order = np.asarray(order)
+        keep = np.zeros(len(order), dtype=bool)
+        keep[frame.index.to_numpy()] = True
+        ids = order[keep[order]]
+    else:
+        rating, reviews = (
+            np.asarray(frame[col], dtype=float) if col in frame.columns else np.full(len(frame), np.nan)
+            for col in RANK_COLUMNS
+        )
+        order = rank_order(rating, reviews)
+        ids = frame.index.to_numpy()[order]
+    ids.setflags(write=False)
+    return ids
+
+
+def filter_spec_key(**spec):
+    """Stable short hash of a filter spec (same filters -> same key across reruns and processes)."""
+    payload = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def top_positions(rating, reviews, mask=None, n=5, order=None):
+    """
+    Positions of the best `n` rows (same ordering as rank_order) among rows where
+    `mask` is True. `mask=None` ranks every row. Pass a precomputed global
+    `order` (rank_order of all rows) to answer many masks without re-sorting:
+    filtering the global order keeps the same tie-breaks as sorting the subset.
+    """
+    if order is None:
+        order = rank_order(rating, reviews)
+    if mask is None:
+        return order[:n]
+    return order[np.asarray(mask, dtype=bool)[order]][:n]
@@ -0,0 +1,366 @@
+# replay_eval.py — offline replay of sessions against ranking strategies (hit-rate / NDCG@k / latency)
+"""
+Each session is a filter spec (what the user searched for) plus the listings
+they clicked. For every ranking strategy the evaluator ranks the spec's
+candidates, takes the top k and checks the clicks against them:
+
+    hit_rate@k   share of sessions with at least one click in the top k
+    ndcg@k       binary-relevance NDCG of the top k
+    latency      time to rank one spec (filter the strategy's global order)
+
+Sessions are split into chunks and evaluated in a process pool. Workers
+memory-map the same Arrow copy of the dataset (dataset_store.py), sort once per
+strategy, and rank each distinct spec once per chunk; the metrics of a chunk
+are computed in one vectorized pass over a (sessions x k) relevance matrix.
+
+Sessions (CSV, JSON lines or Parquet):
+    session_id, country[, property_type][, activities][, min_bedrooms][, price_low, price_high], clicked
+    # activities: "Near Beach|Near Temple"   clicked: listing ids "12|80"
+
+    python replay_eval.py --sessions sessions.parquet --strategies rating_reviews,bayesian
+    python replay_eval.py --synthetic 2000000 --rows 20000 --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import FilterMasks, build_arrow_dataset, listing_ids, numeric_column, open_arrow_dataset
+from ranking import rank_order
+
+MAX_CLICKS = 8  # klik per sesi yang dinilai (sisanya diabaikan)
+
+
+# -------------------- Ranking strategies --------------------
+def _desc(values):
+    """Sort key for descending order with NaN last (for np.lexsort)."""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), np.inf, -values)
+
+
+def _stable_order(*keys):
+    """lexsort on `keys` (most important first) with the row position as final tie-break."""
+    return np.lexsort((np.arange(len(keys[0])),) + tuple(reversed(keys)))
+
+
+def order_rating_reviews(cols):
+    """Current production order (ranking.rank_order): rating desc, then reviews desc."""
+    return rank_order(cols["rating"], cols["reviews"])
+
+
+def order_reviews_rating(cols):
+    """Popularity first: reviews desc, then rating desc."""
+    return _stable_order(_desc(cols["reviews"]), _desc(cols["rating"]))
+
+
+def order_bayesian(cols):
+    """Bayesian-average rating: ratings with few reviews are pulled toward the global mean."""
+    rating, reviews = cols["rating"], np.nan_to_num(cols["reviews"])
+    known = ~np.isnan(rating)
+    mean = float(rating[known].mean()) if known.any() else 0.0
+    prior = float(np.median(reviews)) or 1.0
+    score = np.where(known, (reviews * np.nan_to_num(rating) + prior * mean) / (reviews + prior), np.nan)
+    return _stable_order(_desc(score), _desc(cols["reviews"]))
+
+
+def order_discount(cols):
+    """Best deal first: discount desc, then the production order."""
+    return _stable_order(_desc(cols["discount"]), _desc(cols["rating"]), _desc(cols["reviews"]))
+
+
+STRATEGIES = {
+    "rating_reviews": order_rating_reviews,
+    "reviews_rating": order_reviews_rating,
+    "bayesian": order_bayesian,
+    "discount": order_discount,
+}
+
+# -------------------- Worker state (one per process) --------------------
+_table = None
+_cols = None
+_listing_ids = None
+_orders = {}
+_masks = None
+
+
+def _init_worker(store_path, strategies):
+    global _table, _cols, _listing_ids, _masks
+    _table = open_arrow_dataset(store_path)
+    _cols = {
+        "rating": numeric_column(_table, "review_scores_rating"),
+        "reviews": numeric_column(_table, "number_of_reviews"),
+        "price": numeric_column(_table, "log_price"),
+        "discount": numeric_column(_table, "discount_pct"),
+        "bedrooms": numeric_column(_table, "bedrooms"),
+    }
+    _listing_ids = listing_ids(_table)
+    # satu kali sort global per strategi; tiap spec cukup memfilter urutan ini
+    _orders.clear()
+    _orders.update({name: STRATEGIES[name](_cols) for name in strategies})
+    # filter sama seperti app dan batch_recommend.py (dataset_store.FilterMasks)
+    _masks = FilterMasks(_table)
+
+
+def _spec_mask(spec):
+    """Candidate mask for a spec (None = every listing)."""
+    country, property_type, activities, min_bedrooms, price_low, price_high = spec
+    mask = _masks.country(country)
+    parts = [_masks.property_type(property_type)]
+    parts.extend(_masks.activity(activity) for activity in activities)
+    if min_bedrooms:
+        parts.append(_masks.cached(("bedrooms", min_bedrooms), lambda: _cols["bedrooms"] >= min_bedrooms))
+    if price_low is not None or price_high is not None:
+        low = -np.inf if price_low is None else price_low
+        high = np.inf if price_high is None else price_high
+        price = _cols["price"]
+        parts.append((price >= low) & (price <= high))
+    for part in parts:
+        if part is not None:
+            mask = part if mask is None else mask & part
+    return mask
+
+
+def _evaluate_chunk(task):
+    """
+    Metrics of one chunk: {strategy: {"hits", "ndcg", "latency_s"}} plus "sessions" and "filter_s".
+    `specs` are the distinct specs of the chunk, `spec_idx` maps sessions to them.
+    """
+    specs, spec_idx, clicked, k = task
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    n_clicks = (clicked >= 0).sum(axis=1)
+    ideal = np.concatenate(([0.0], np.cumsum(discounts)))[np.minimum(n_clicks, k)]
+
+    filter_s = np.empty(len(specs))
+    masks = []
+    for i, spec in enumerate(specs):
+        t0 = time.perf_counter()
+        masks.append(_spec_mask(spec))
+        filter_s[i] = time.perf_counter() - t0
+
+    result = {"sessions": len(spec_idx), "filter_s": filter_s, "strategies": {}}
+    for name, order in _orders.items():
+        top = np.full((len(specs), k), -1, dtype=np.int64)
+        latency = np.empty(len(specs))
+        for i, mask in enumerate(masks):
+            t0 = time.perf_counter()
+            pos = order[:k] if mask is None else order[mask[order]][:k]
+            top[i, :len(pos)] = _listing_ids[pos]
+            latency[i] = time.perf_counter() - t0
+
+        # (sesi x k) relevansi biner: listing di posisi j termasuk yang diklik?
+        ranked = top[spec_idx]
+        relevant = (ranked[:, :, None] == clicked[:, None, :]).any(axis=2) & (ranked >= 0)
+        dcg = relevant @ discounts
+        ndcg = np.divide(dcg, ideal, out=np.zeros_like(dcg), where=ideal > 0)
+        result["strategies"][name] = {
+            "hits": int(relevant.any(axis=1).sum()),
+            "ndcg": float(ndcg.sum()),
+            "latency_s": latency,
+        }
+    return result
+
+
+# -------------------- Sessions --------------------
+def _clean_text(values):
+    return [None if pd.isna(v) or str(v).strip() == "" else str(v).strip() for v in values]
+
+
+def _optional_column(frame, name, default=None):
+    return frame[name] if name in frame.columns else pd.Series(default, index=frame.index)
+
+
+def sessions_from_frame(frame):
+    """(specs, spec_idx, clicked) from a session table; see the module docstring for columns."""
+    if "country" not in frame.columns or "clicked" not in frame.columns:
+        raise ValueError("session file needs at least 'country' and 'clicked' columns")
+
+    activities = [
+        tuple(sorted(a.strip() for a in acts.split("|") if a.strip())) if acts else ()
+        for acts in _clean_text(_optional_column(frame, "activities"))
+    ]
+    min_bedrooms = pd.to_numeric(_optional_column(frame, "min_bedrooms", 0), errors="coerce").fillna(0).astype(int)
+    price_low = pd.to_numeric(_optional_column(frame, "price_low"), errors="coerce")
+    price_high = pd.to_numeric(_optional_column(frame, "price_high"), errors="coerce")
+    keys = pd.DataFrame(
+        {
+            "country": _clean_text(frame["country"]),
+            "property_type": _clean_text(_optional_column(frame, "property_type")),
+            "activities": activities,
+            "min_bedrooms": min_bedrooms.to_numpy(),
+            "price_low": price_low.astype(object).where(price_low.notna(), None),
+            "price_high": price_high.astype(object).where(price_high.notna(), None),
+        }
+    )
+    spec_idx, uniques = pd.factorize(pd.Series(list(keys.itertuples(index=False, name=None))))
+
+    clicked = (
+        frame["clicked"].astype(str).str.split("|", expand=True, n=MAX_CLICKS)
+        .iloc[:, :MAX_CLICKS].apply(pd.to_numeric, errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+    )
+    return list(uniques), spec_idx.astype(np.int64), clicked
+
+
+def read_sessions(path):
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    elif path.endswith((".jsonl", ".json")):
+        frame = pd.read_json(path, lines=True, dtype={"clicked": str})
+    else:
+        frame = pd.read_csv(path, dtype={"clicked": str})
+    return sessions_from_frame(frame)
+
+
+def make_synthetic_sessions(store_path, n_sessions, seed=42, temperature=0.5):
+    """
+    Sessions whose clicks follow a hidden utility (rating, review count, discount
+    and noise), with the spec derived from the clicked listing: its country, often
+    its property type, sometimes one of its attractions, a bedroom minimum and a
+    price band. Strategies closer to that utility score higher.
+    """
+    table = open_arrow_dataset(store_path)
+    rng = np.random.default_rng(seed)
+    n_rows = table.num_rows
+    rating = np.nan_to_num(numeric_column(table, "review_scores_rating"), nan=60.0)
+    reviews = np.nan_to_num(numeric_column(table, "number_of_reviews"))
+    discount = np.nan_to_num(numeric_column(table, "discount_pct"))
+    price = numeric_column(table, "log_price")
+    bedrooms = np.nan_to_num(numeric_column(table, "bedrooms"))
+
+    utility = 0.08 * rating + 0.4 * np.log1p(reviews) + 0.03 * discount
+    weights = np.exp((utility - utility.max()) / temperature)
+    cdf = np.cumsum(weights) / weights.sum()
+    clicked_pos = np.minimum(np.searchsorted(cdf, rng.random(n_sessions)), n_rows - 1)
+
+    def column(name):
+        return np.asarray(table.column(name).to_pylist(), dtype=object) if name in table.column_names else np.full(n_rows, None, dtype=object)
+
+    countries, ptypes, specs_text = column("country"), column("property_type"), column("specification")
+    country = countries[clicked_pos]
+    ptype = np.where(rng.random(n_sessions) < 0.6, ptypes[clicked_pos], None)
+    with_activity = rng.random(n_sessions) < 0.3
+    activities = [
+        (str(rng.choice(str(specs_text[p]).split(", "))),) if use and specs_text[p] else ()
+        for p, use in zip(clicked_pos, with_activity)
+    ]
+    min_bedrooms = np.where(rng.random(n_sessions) < 0.3, np.minimum(bedrooms[clicked_pos], 2), 0).astype(int)
+    band = rng.random(n_sessions) < 0.3
+    low = np.floor(price[clicked_pos] / 100.0) * 100.0
+
+    frame = pd.DataFrame(
+        {
+            "country": country,
+            "property_type": ptype,
+            "activities": ["|".join(a) for a in activities],
+            "min_bedrooms": min_bedrooms,
+            "price_low": np.where(band, low, np.nan),
+            "price_high": np.where(band, low + 100.0, np.nan),
+            "clicked": listing_ids(table)[clicked_pos].astype(str),
+        }
+    )
+    return sessions_from_frame(frame)
+
+
+# -------------------- Driver --------------------
+def _latency_summary(values):
+    arr = np.asarray(values, dtype=float) * 1e6
+    if not arr.size:
+        return None
+    return {
+        "queries": int(arr.size),
+        "p50_us": round(float(np.percentile(arr, 50)), 1),
+        "p90_us": round(float(np.percentile(arr, 90)), 1),
+        "p99_us": round(float(np.percentile(arr, 99)), 1),
+    }
+
+
+def run_eval(sessions, dataset_path, strategies=None, k=5, workers=None, chunk_size=200_000):
+    """Evaluate `sessions` = (specs, spec_idx, clicked) against `strategies`; returns the report dict."""
+    t0 = time.perf_counter()
+    strategies = list(strategies or STRATEGIES)
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"unknown strategies {unknown}; available: {sorted(STRATEGIES)}")
+    store_path = dataset_path if dataset_path.endswith(".arrow") else build_arrow_dataset(dataset_path)
+    specs, spec_idx, clicked = sessions
+
+    tasks = []
+    for start in range(0, len(spec_idx), chunk_size):
+        # hanya spec yang dipakai chunk ini yang dikirim ke worker
+        used, local_idx = np.unique(spec_idx[start:start + chunk_size], return_inverse=True)
+        tasks.append(([specs[i] for i in used], local_idx, clicked[start:start + chunk_size], k))
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(store_path, strategies)) as pool:
+        results = list(pool.map(_evaluate_chunk, tasks))
+
+    n = sum(r["sessions"] for r in results)
+    report = {
+        "sessions": n,
+        "distinct_specs": len(specs),
+        "k": k,
+        "workers": workers,
+        "filter_latency": _latency_summary(np.concatenate([r["filter_s"] for r in results]) if results else []),
+        "strategies": {},
+    }
+    for name in strategies:
+        parts = [r["strategies"][name] for r in results]
+        report["strategies"][name] = {
+            f"hit_rate@{k}": round(sum(p["hits"] for p in parts) / n, 4) if n else None,
+            f"ndcg@{k}": round(sum(p["ndcg"] for p in parts) / n, 4) if n else None,
+            "latency": _latency_summary(np.concatenate([p["latency_s"] for p in parts]) if parts else []),
+        }
+    wall = time.perf_counter() - t0
+    report["wall_s"] = round(wall, 3)
+    report["sessions_per_s"] = round(n / wall, 1) if wall > 0 else None
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline replay evaluation of ranking strategies.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sessions", help="CSV, JSON-lines or Parquet session file")
+    source.add_argument("--synthetic", type=int, help="generate this many synthetic sessions")
+    parser.add_argument("--dataset", default=None, help="listings CSV or prebuilt .arrow (default: the app dataset)")
+    parser.add_argument("--rows", type=int, default=20000, help="synthetic listings when --dataset is not given")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help=f"comma separated: {', '.join(STRATEGIES)}")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="sessions per task")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="stay-replay-") as tmp:
+        dataset = args.dataset
+        if dataset is None and args.synthetic:
+            from synthetic_data import write_synthetic_csv
+            dataset = write_synthetic_csv(os.path.join(tmp, "listings.csv"), n_rows=args.rows, seed=args.seed)
+        dataset = dataset or "dataset/Airbnb_Cleaned.csv"
+        store_path = dataset if dataset.endswith(".arrow") else build_arrow_dataset(dataset)
+
+        t0 = time.perf_counter()
+        if args.synthetic:
+            sessions = make_synthetic_sessions(store_path, args.synthetic, seed=args.seed)
+        else:
+            sessions = read_sessions(args.sessions)
+        load_s = time.perf_counter() - t0
+
+        report = run_eval(sessions, store_path, args.strategies.split(","), args.k, args.workers, args.chunk_size)
+        report["load_sessions_s"] = round(load_s, 3)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
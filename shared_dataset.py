@@ -0,0 +1,127 @@
+# shared_dataset.py — publish the dataset once into shared memory, attach from every worker
+"""
+One loader process parses the CSV and publishes, under a tmpfs directory
+(default /dev/shm/personalized_stay):
+
+    manifest.json                   current version + file list (swapped atomically)
+    v<version>/listings.arrow       typed columns (Arrow IPC, uncompressed)
+    v<version>/rank_order.npy       rating-then-reviews order (ranking.rank_order)
+    v<version>/price_positions.npy  rows sorted by price (PriceIndex)
+    v<version>/geo_order.npy        rows sorted by latitude, longitude (Special Deals)
+
+Workers (main.py with STAY_SHARED_DATASET=<dir>) memory-map these files
+read-only. Numeric columns and indexes are plain views on the mapping, string
+columns stay Arrow-backed (pd.ArrowDtype), so N workers share one physical copy.
+
+    python shared_dataset.py --csv dataset/Airbnb_Cleaned.csv --root /dev/shm/personalized_stay
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dataset_store import open_arrow_dataset, read_listings_csv, write_arrow_dataset
+from ranking import rank_order
+
+DEFAULT_ROOT = "/dev/shm/personalized_stay"
+MANIFEST_FILE = "manifest.json"
+INDEX_FILES = ("rank_order", "price_positions", "geo_order")
+
+
+def _floats(frame, name):
+    if name not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def build_indexes(frame):
+    """Row-position indexes over `frame` (rank, price and geo order)."""
+    rating = _floats(frame, "review_scores_rating")
+    reviews = _floats(frame, "number_of_reviews")
+    prices = _floats(frame, "log_price")
+    lat = _floats(frame, "latitude")
+    lon = _floats(frame, "longitude")
+
+    valid = np.flatnonzero(~np.isnan(prices))
+    # NaN di akhir, sama seperti sort_values(["latitude", "longitude"])
+    lat_key = np.where(np.isnan(lat), np.inf, lat)
+    lon_key = np.where(np.isnan(lon), np.inf, lon)
+    return {
+        "rank_order": rank_order(rating, reviews),
+        "price_positions": valid[np.argsort(prices[valid], kind="stable")],
+        "geo_order": np.lexsort((np.arange(len(frame)), lon_key, lat_key)),
+    }
+
+
+def publish(df, root=DEFAULT_ROOT, keep=2):
+    """Write a new version under `root`, switch the manifest to it, prune old versions. Returns the manifest."""
+    version = time.time_ns()
+    vdir = f"v{version}"
+    os.makedirs(os.path.join(root, vdir), exist_ok=True)
+
+    write_arrow_dataset(df, os.path.join(root, vdir, "listings.arrow"))
+    for name, arr in build_indexes(df).items():
+        np.save(os.path.join(root, vdir, f"{name}.npy"), arr.astype(np.int64))
+
+    manifest = {"version": version, "dir": vdir, "rows": int(len(df)), "columns": list(df.columns)}
+    tmp_path = os.path.join(root, f"{MANIFEST_FILE}.tmp-{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(root, MANIFEST_FILE))
+
+    # versi lama tetap ada sebentar untuk worker yang masih attach (mmap tetap valid walau file dihapus)
+    versions = sorted(d for d in os.listdir(root) if d.startswith("v") and os.path.isdir(os.path.join(root, d)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return manifest
+
+
+def read_manifest(root):
+    """Current manifest dict, or None if nothing has been published under `root`."""
+    try:
+        with open(os.path.join(root, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _arrow_backed_strings(arrow_type):
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+class SharedDataset:
+    """Read-only, zero-copy view of a published version. Never modify `frame`."""
+
+    def __init__(self, root=DEFAULT_ROOT, manifest=None):
+        """`manifest`: the version to open (as returned by read_manifest); defaults to the current one."""
+        self.manifest = manifest or read_manifest(root)
+        if self.manifest is None:
+            raise FileNotFoundError(f"no shared dataset published under {root}")
+        self.root = root
+        self.version = self.manifest["version"]
+        vdir = os.path.join(root, self.manifest["dir"])
+
+        self.table = open_arrow_dataset(os.path.join(vdir, "listings.arrow"))
+        # split_blocks + tanpa konsolidasi: kolom float jadi view langsung ke mmap
+        self.frame = self.table.to_pandas(
+            types_mapper=_arrow_backed_strings, split_blocks=True, self_destruct=False
+        )
+        self.indexes = {
+            name: np.load(os.path.join(vdir, f"{name}.npy"), mmap_mode="r") for name in INDEX_FILES
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the listings dataset into shared memory for all workers.")
+    parser.add_argument("--csv", default="dataset/Airbnb_Cleaned.csv")
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    parser.add_argument("--keep", type=int, default=2, help="published versions to keep")
+    args = parser.parse_args()
+    print(publish(read_listings_csv(args.csv), args.root, args.keep))
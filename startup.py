@@ -0,0 +1,60 @@
+# startup.py — run independent startup work concurrently instead of one step after another
+"""
+A StartupPipeline owns a private asyncio loop (on a daemon thread) and a
+thread pool. Each submitted job is a blocking function (file I/O, base64,
+CSV parsing, NumPy sorting) that the loop offloads to the pool as soon as the
+jobs it depends on are done, so e.g. the hero images are encoded while the CSV
+is still being parsed.
+
+    pipeline = StartupPipeline()
+    pipeline.submit("dataset", read_listings_csv, path)
+    pipeline.submit("indexes", build_indexes, after=("dataset",))   # gets the dataset as 1st arg
+    df = pipeline.result("dataset")                                 # blocks only for what is needed now
+
+main.py keeps one pipeline per process in st.cache_resource; a rerun waits
+only for the results of the sections it is about to draw. timings() (start and
+end of every job) is shown on the memory admin page (main.py?admin=memory).
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StartupPipeline:
+    def __init__(self, max_workers=4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="startup-loop", daemon=True)
+        self._thread.start()
+        self._futures = {}
+        self._timings = {}
+        self._started = time.perf_counter()
+
+    def submit(self, name, fn, *args, after=()):
+        """
+        Schedule `fn(*dep_results, *args)` once every job in `after` has finished.
+        Returns a concurrent.futures.Future; a failed dependency fails this job too.
+        """
+        deps = [self._futures[dep] for dep in after]
+        self._futures[name] = asyncio.run_coroutine_threadsafe(self._job(name, fn, args, deps), self._loop)
+        return self._futures[name]
+
+    async def _job(self, name, fn, args, deps):
+        dep_results = [await asyncio.wrap_future(dep) for dep in deps]
+        start = time.perf_counter()
+        try:
+            return await self._loop.run_in_executor(self._pool, fn, *dep_results, *args)
+        finally:
+            self._timings[name] = (start - self._started, time.perf_counter() - self._started)
+
+    def __contains__(self, name):
+        return name in self._futures
+
+    def result(self, name, timeout=None):
+        """Block until job `name` is done and return its result (re-raises its exception)."""
+        return self._futures[name].result(timeout)
+
+    def timings(self):
+        """{job: (start_s, end_s)} relative to pipeline creation, for finished jobs."""
+        return {name: (round(start, 4), round(end, 4)) for name, (start, end) in self._timings.items()}
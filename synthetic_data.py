@@ -0,0 +1,92 @@
+# synthetic_data.py — offline synthetic listings with the same columns as dataset/Airbnb_Cleaned.csv
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+COUNTRIES = ["USA", "Indonesia", "France", "Japan", "Spain", "Australia", "Italy", "Thailand"]
+PROPERTY_TYPES = ["Apartment", "House", "Villa", "B&B", "Hostel", "Resort", "Condominium", "Loft"]
+ATTRACTIONS = [
+    "Near Airport", "Near Beach", "Near Beachfront", "Near City Center", "Near Downtown", "Near Market",
+    "Near Mountain View", "Near National Park", "Near Ocean Point", "Near Old Town", "Near Riverside Walk",
+    "Near Shopping Mall", "Near Sunset Point", "Near Temple", "Near Train Station", "Near Waterfall View",
+]
+
+# Perkiraan titik tengah tiap negara supaya latitude/longitude tidak acak total
+_COUNTRY_CENTERS = {
+    "USA": (37.0, -95.0), "Indonesia": (-8.4, 115.2), "France": (46.2, 2.2), "Japan": (36.2, 138.2),
+    "Spain": (40.4, -3.7), "Australia": (-25.3, 133.8), "Italy": (41.9, 12.6), "Thailand": (15.9, 100.9),
+}
+
+
+def make_synthetic_listings(n_rows=5000, seed=42, missing_rate=0.02):
+    """
+    Build a DataFrame shaped like the cleaned Airbnb dataset.
+    Deterministic for a given seed, roughly 40% of rows are USA listings.
+    `missing_rate` blanks out a share of rating / was_price / bedrooms like the raw data.
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.full(len(COUNTRIES), 0.6 / (len(COUNTRIES) - 1))
+    weights[0] = 0.4
+    country = rng.choice(COUNTRIES, size=n_rows, p=weights)
+    property_type = rng.choice(PROPERTY_TYPES, size=n_rows)
+
+    centers = np.array([_COUNTRY_CENTERS[c] for c in country])
+    latitude = centers[:, 0] + rng.normal(0, 2.0, n_rows)
+    longitude = centers[:, 1] + rng.normal(0, 2.0, n_rows)
+
+    price = np.round(rng.uniform(30, 450, n_rows), 2)
+    was_price = np.round(price * rng.uniform(1.05, 1.6, n_rows), 2)
+
+    n_attr = rng.integers(1, 4, n_rows)
+    specification = [
+        ", ".join(rng.choice(ATTRACTIONS, size=k, replace=False)) for k in n_attr
+    ]
+
+    df = pd.DataFrame(
+        {
+            "id": np.arange(1, n_rows + 1),
+            "name": [f"{pt} Stay #{i} in {c}" for i, (pt, c) in enumerate(zip(property_type, country), 1)],
+            "thumbnail_url": [f"https://picsum.photos/seed/{i}/600/400" for i in range(1, n_rows + 1)],
+            "review_scores_rating": rng.integers(60, 101, n_rows).astype(float),
+            "number_of_reviews": rng.integers(0, 500, n_rows),
+            "was_price": was_price,
+            "log_price": price,
+            "country": country,
+            "property_type": property_type,
+            "bedrooms": rng.integers(1, 6, n_rows).astype(float),
+            "bathrooms": rng.integers(1, 4, n_rows).astype(float),
+            "beds": rng.integers(1, 8, n_rows).astype(float),
+            "specification": specification,
+            "latitude": latitude,
+            "longitude": longitude,
+            "available_date": pd.Timestamp("2025-10-01") + pd.to_timedelta(rng.integers(0, 60, n_rows), unit="D"),
+        }
+    )
+
+    # Sisipkan sedikit nilai kosong seperti data asli
+    for col in ("review_scores_rating", "was_price", "bedrooms"):
+        holes = rng.random(n_rows) < missing_rate
+        df.loc[holes, col] = np.nan
+    return df
+
+
+def write_synthetic_csv(path, n_rows=5000, seed=42, missing_rate=0.02):
+    """Write the synthetic dataset to `path` (creating folders) and return the path."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    make_synthetic_listings(n_rows=n_rows, seed=seed, missing_rate=missing_rate).to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Airbnb_Cleaned.csv for offline runs.")
+    # wajib diisi: default lama (dataset/Airbnb_Cleaned.csv) diam-diam menimpa dataset asli
+    parser.add_argument("--out", required=True, help="CSV path to write, e.g. /tmp/synthetic/Airbnb_Cleaned.csv")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--missing-rate", type=float, default=0.02)
+    args = parser.parse_args()
+    print(write_synthetic_csv(args.out, n_rows=args.rows, seed=args.seed, missing_rate=args.missing_rate))
@@ -0,0 +1,104 @@
+# tests/test_attractions.py — the attraction filter expansion, locked for the dropdown's original phrase list
+"""
+Run with `pytest -q` (pytest.ini puts the repository root on the import path).
+
+BASELINE_PHRASES is the `activity_options` list the app shipped with before the
+options came from the data. Every phrase not in EXPECTED_EXPANSIONS must expand
+to itself only; widening a synonym group in attractions.CONCEPT_KEYWORDS shows
+up here as a diff to review.
+"""
+import numpy as np
+import pytest
+
+from attractions import AttractionIndex
+
+BASELINE_PHRASES = [
+    "Near Airport", "Near Art Alley", "Near Art Gallery", "Near Art Lane", "Near Art Market", "Near Art Street",
+    "Near Artisan Market", "Near Beach", "Near Beach Walk", "Near Beachfront", "Near Botanical Garden",
+    "Near Boutique Street", "Near Business District", "Near Business Hub", "Near Camping Spot", "Near Central Park",
+    "Near City Center", "Near City Market", "Near City Museum", "Near Cliff Trail", "Near Cliff View",
+    "Near Cliff Viewpoint", "Near Coastal Boardwalk", "Near Coffee Quarter", "Near Concert Arena",
+    "Near Convention Hall", "Near Creative District", "Near Creative Hub", "Near Cultural Market",
+    "Near Cultural Village", "Near Downtown", "Near Downtown Street", "Near Food Street", "Near Forest Edge",
+    "Near Forest Reserve", "Near Forest Retreat", "Near Forest Trail", "Near Golf Course", "Near Golf Park",
+    "Near Harbor View", "Near Harbor Walk", "Near Harborfront", "Near Heritage District", "Near Heritage Town",
+    "Near Hiking Trail", "Near Hilltop Café", "Near Historical Museum", "Near Lake Garden", "Near Lake Trail",
+    "Near Lakefront", "Near Lakeside Pavilion", "Near Lookout Point", "Near Marina Bay", "Near Marina Pier",
+    "Near Market", "Near Mountain Peak", "Near Mountain Trail", "Near Mountain Valley", "Near Mountain View",
+    "Near National Park", "Near Nature Reserve", "Near Night Bazaar", "Near Night Street", "Near Nightlife Area",
+    "Near Ocean Breeze Point", "Near Ocean Point", "Near Ocean Viewpoint", "Near Oceanfront", "Near Old Town",
+    "Near Open Air Café", "Near Park District", "Near Pedestrian Bridge", "Near Picnic Ground", "Near Rice Terrace",
+    "Near River View", "Near Riverbank", "Near Riverbank Trail", "Near Riverbank Walk", "Near Riverside Café",
+    "Near Riverside Garden", "Near Riverside Lodge", "Near Riverside Walk", "Near Riverwalk", "Near Rooftop Bar",
+    "Near Scenic Park", "Near Seafood Market", "Near Shopping Avenue", "Near Shopping District", "Near Shopping Mall",
+    "Near Shopping Promenade", "Near Shopping Street", "Near Surf Spot", "Near Sunset Bar", "Near Sunset Point",
+    "Near Sunset View", "Near Stadium", "Near Temple", "Near Temple Courtyard", "Near Train Station", "Near Urban Park",
+    "Near Valley View", "Near Village Café", "Near Village View", "Near Village Walk", "Near Waterfall View"
+]
+
+EXPECTED_EXPANSIONS = {
+    "Near Beach": [
+        "Near Beach Walk", "Near Beachfront", "Near Coastal Boardwalk", "Near Ocean Breeze Point",
+        "Near Ocean Point", "Near Ocean Viewpoint", "Near Oceanfront",
+    ],
+    "Near Beachfront": [
+        "Near Beach", "Near Beach Walk", "Near Coastal Boardwalk", "Near Ocean Breeze Point",
+        "Near Ocean Point", "Near Ocean Viewpoint", "Near Oceanfront",
+    ],
+    "Near Cliff View": ["Near Cliff Viewpoint"],
+    "Near Downtown": ["Near Downtown Street"],
+    "Near Harborfront": ["Near Harbor View", "Near Harbor Walk", "Near Marina Bay", "Near Marina Pier"],
+    "Near Lakefront": ["Near Lake Garden", "Near Lake Trail", "Near Lakeside Pavilion"],
+    "Near Lookout Point": ["Near Cliff Viewpoint", "Near Ocean Viewpoint"],
+    "Near Market": [
+        "Near Art Market", "Near Artisan Market", "Near City Market", "Near Cultural Market",
+        "Near Seafood Market",
+    ],
+    "Near Ocean Point": ["Near Ocean Breeze Point", "Near Ocean Viewpoint"],
+    "Near Oceanfront": [
+        "Near Beach", "Near Beach Walk", "Near Beachfront", "Near Coastal Boardwalk",
+        "Near Ocean Breeze Point", "Near Ocean Point", "Near Ocean Viewpoint",
+    ],
+    "Near Riverbank": [
+        "Near River View", "Near Riverbank Trail", "Near Riverbank Walk", "Near Riverside Café",
+        "Near Riverside Garden", "Near Riverside Lodge", "Near Riverside Walk", "Near Riverwalk",
+    ],
+    "Near Riverbank Walk": ["Near Riverside Walk", "Near Riverwalk"],
+    "Near Riverside Walk": ["Near Riverbank Walk", "Near Riverwalk"],
+    "Near Riverwalk": ["Near Riverbank Walk", "Near Riverside Walk"],
+    "Near Temple": ["Near Temple Courtyard"],
+}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return AttractionIndex([", ".join(BASELINE_PHRASES)])
+
+
+def test_every_baseline_phrase_is_an_option(index):
+    assert index.phrases == sorted(BASELINE_PHRASES)
+
+
+@pytest.mark.parametrize("phrase", sorted(BASELINE_PHRASES))
+def test_expansion_is_locked(index, phrase):
+    assert index.related(phrase) == [phrase, *EXPECTED_EXPANSIONS.get(phrase, [])]
+
+
+@pytest.mark.parametrize(
+    "phrase",
+    [
+        "Near Rice Terrace", "Near Stadium", "Near Art Gallery", "Near Airport", "Near Night Bazaar",
+        "Near Sunset View", "Near Village View", "Near Art Street",
+    ],
+)
+def test_specific_places_do_not_widen(index, phrase):
+    assert index.related(phrase) == [phrase]
+
+
+def test_mask_is_or_of_related_and_across_selected():
+    specs = ["Near Beach, Near Old Town", "Near Oceanfront", "Near Old Town", "Near Stadium", None]
+    index = AttractionIndex(specs)
+    assert index.mask(["Near Beach"]).tolist() == [True, True, False, False, False]
+    assert index.mask(["Near Beach", "Near Old Town"]).tolist() == [True, False, False, False, False]
+    assert index.mask(["near  stadium"]).tolist() == [False, False, False, True, False]
+    assert np.all(index.mask([]))